@@ -7,9 +7,10 @@
 
 from PyMOGEP.evolution.linker import defaultLinker
 from PyMOGEP.decorator import cache
-import random
+from PyMOGEP import objective
 import itertools
-from PyMOGEP.gene import (Gene,)
+import numpy as np
+from PyMOGEP.gene import (Gene, CompactGene, CompactPrefixGene)
 
 
 class MetaChromosome(type):
@@ -22,7 +23,12 @@ class MetaChromosome(type):
     Sets the following attributes on a chromosome class:
         - arity: maximum functional arity
         - symbols: symbols that can reside in the headLength
-    Also turns caching of fitness values on for all chromosomes.
+        - alphabet: symbols and the RNC symbol '?', indexed by the 
+                    compact encoding of the chromosome
+        - variables: terminals naming the columns of the data set
+    Also turns caching of fitness values on for all chromosomes,
+    binds the compact gene type to the alphabet, and gives the subclasses
+    of compact chromosomes an empty __slots__.
     '''
     
     def __new__(self, name, bases, dct):
@@ -35,8 +41,20 @@ class MetaChromosome(type):
         @param bases: base classes
         @param dct: class dict
         '''
+        if ('__slots__' not in dct and 
+            any(getattr(base, 'compact', False) for base in bases)):
+            dct['__slots__'] = ()
+        
         typ = type.__new__(self, name, bases, dct)
         typ.symbols = typ.functions + typ.terminals
+        typ.alphabet = tuple(typ.symbols) + ('?',)
+        typ._alphabetIndex = dict((sym, idx) for idx, sym in 
+                                  reversed(list(enumerate(typ.alphabet))))
+        typ.variables = tuple(sym for sym in typ.terminals 
+                              if isinstance(sym, str))
+        if (issubclass(typ.gene_type, CompactGene) and 
+            typ.gene_type.alphabet != typ.alphabet):
+            typ.gene_type = typ.gene_type.bind(typ.alphabet)
         
         # Find the max arity of functions
         try:
@@ -58,15 +76,30 @@ class Chromosome(object):
     And override these functions:
         - _fitness: fitness of a given individual
         - _solved:  True if the problem is optimally solved (optional)
+        - _fitnessesStart, _fitnessesChunk, _fitnessesFinish: accumulating
+          the fitnesses chunk by chunk (optional, chunked evaluation)
+
+    Or declare the objectives instead of the fitness functions:
+        - objectives: tuple of PyMOGEP.objective.Objective, e.g.
+          (MeanAbsoluteError('f1', 0), MaxAbsoluteError('f1', 0)), the
+          output is the index of the gene linked by the default linker,
+          or None if the chromosome has one gene
     '''
     __metaclass__ = MetaChromosome  # setting meta class
+    __slots__ = ('genes', 'headLength', 'linker', 'RNCGenerator', 
+                 'ParetoRank', 'crowdingDistance', 'dominatedCount', 
+                 'dominatingSet', '_id', 
+                 '_fitnesses_cache', '_repr_cache', '_key_cache')
     _id_counter = 1   # recording current id number
     gene_type = Gene  # setting gene type
+    compact = False   # subclasses without __dict__
 
     functions = ()  # user specified
     terminals = ()  # user specified
+    objectives = ()  # user specified, declarative objectives
     symbols = ()  # overridden by meta chromosome class
-    headLength = tail = length = arity = 0
+    variables = ()  # overridden by meta chromosome class
+    tail = length = arity = 0
   
     # Unique ID of the chromosome
     chromosomeID = property(lambda self: self._id, doc='Chromosome #')
@@ -81,22 +114,93 @@ class Chromosome(object):
      
     @classmethod
     def randomChromosome(cls, headLength, numOfGenes=1, 
-                         linker=defaultLinker, RNCGenerator=None):
-        '''class method for randomly generate genes of the chromosome'''
+                         linker=defaultLinker, RNCGenerator=None, 
+                         rng=np.random):
+        '''
+        class method for randomly generate genes of the chromosome
+        @param rng, numpy.random.RandomState, the alleles of all genes are
+                    drawn at once
+        '''
+        return cls.randomChromosomes(1, headLength, numOfGenes, linker, 
+                                     RNCGenerator, rng)[0]
+
+    @classmethod
+    def randomChromosomes(cls, n_chromosomes, headLength, numOfGenes=1, 
+                          linker=defaultLinker, RNCGenerator=None, 
+                          rng=np.random, ramped=False):
+        '''
+        class method for randomly generate a batch of chromosomes, the 
+        alleles of all chromosomes are drawn at once.
+        
+        ramped half-and-half: the expressions of the chromosomes are ramped
+        by the level, from 1 to headLength, the head alleles after the 
+        level are terminals, thus the size of the expression is limited 
+        by the level. Half of the chromosomes are full, their head alleles 
+        before the level are functions, and the other half are grown, 
+        their head alleles before the level are random symbols.
+        
+        @param n_chromosomes: positive integer, number of chromosomes
+        @param rng, numpy.random.RandomState
+        @param ramped: boolean, ramped half-and-half initialization instead
+                       of the uniform alleles
+        @return: list of chromosomes
+        '''
         tail = headLength * (cls.arity - 1) + 1
-        newGenes = [None] * numOfGenes
         if RNCGenerator:
             symbols = list(cls.symbols) + ['?',]
             terminals = list(cls.terminals) + ['?',]
         else:
             symbols = cls.symbols
             terminals = cls.terminals
-        for idx in xrange(numOfGenes):
-            headAlleles = [random.choice(symbols)   for _ in xrange(headLength)]
-            tailAlleles = [random.choice(terminals) for _ in xrange(tail)]            
-            newGenes[idx] = cls.gene_type(headAlleles + tailAlleles, headLength,
-                                           RNCGenerator = RNCGenerator)
-        return cls(newGenes, headLength, linker, RNCGenerator = RNCGenerator)
+        shape = (n_chromosomes, numOfGenes)
+        heads = rng.randint(0, len(symbols), shape + (headLength, ))
+        tails = rng.randint(0, len(terminals), shape + (tail, ))
+        
+        n_functions = len(cls.functions)
+        if ramped and n_functions:
+            # the terminals follow the functions in the symbols
+            functions = rng.randint(0, n_functions, heads.shape)
+            headTerminals = n_functions + rng.randint(0, len(terminals), 
+                                                      heads.shape)
+            order = np.arange(n_chromosomes)
+            levels = 1 + (order // 2) % headLength
+            full = (order % 2 == 0)[:, None, None]
+            heads = np.where(np.arange(headLength) >= levels[:, None, None],
+                             headTerminals, np.where(full, functions, heads))
+        
+        heads, tails = heads.tolist(), tails.tolist()
+        chromosomes = [None] * n_chromosomes
+        for chroIdx in xrange(n_chromosomes):
+            newGenes = [None] * numOfGenes
+            for idx in xrange(numOfGenes):
+                headAlleles = [symbols[code] for code in heads[chroIdx][idx]]
+                tailAlleles = [terminals[code] for code in tails[chroIdx][idx]]
+                newGenes[idx] = cls.gene_type(headAlleles + tailAlleles, 
+                                    headLength, RNCGenerator = RNCGenerator)
+            chromosomes[chroIdx] = cls(newGenes, headLength, linker, 
+                                       RNCGenerator = RNCGenerator)
+        return chromosomes
+
+    @classmethod
+    def decode(cls, encoding, headLength, linker=defaultLinker, 
+               RNCGenerator=None):
+        '''
+        class method for rebuilding a chromosome from its compact encoding
+        @param encoding: return value of Chromosome.encode()
+        @param headLength: integer, length (not index) of the gene heads
+        @param linker: linker function for gene evaluation
+        @param RNCGenerator, random number generator for RNC algorithm of
+                             the evolution of the decoded chromosome
+        '''
+        genes = []
+        for codes, Dc in encoding:
+            gene = cls.gene_type([cls.alphabet[code] for code in codes], 
+                                 headLength)
+            if Dc is not None:
+                gene.Dc = Dc
+                gene.RNCGenerator = RNCGenerator
+            genes.append(gene)
+        return cls(genes, headLength, linker, RNCGenerator)
 
     def __init__(self, genes, headLength, linker=defaultLinker, RNCGenerator=None):
         '''
@@ -123,6 +227,18 @@ class Chromosome(object):
         self._id = type(self)._id_counter
         type(self)._id_counter += 1
 
+    def encode(self):
+        '''
+        compact encoding of the chromosome, the functions and terminals
+        are replaced by their indices in cls.alphabet.
+        @return: tuple of (tuple of allele indices, RNC constants or None)
+                 of each gene
+        '''
+        index = type(self)._alphabetIndex
+        return tuple((tuple(index[allele] for allele in gene), 
+                      getattr(gene, 'Dc', None))
+                     for gene in self.genes)
+
     def dominating(self, other):
         '''
         dominating comparison (not partial order comparison)
@@ -174,6 +290,16 @@ class Chromosome(object):
     def genesEvalLength(self):
         return sum(g.evalLength for g in self.genes)
     
+    @cache
+    def _key(self):
+        '''
+        chromosomes with the same key are evaluated to the same results
+        '''
+        return (type(self), self.linker, tuple(g.key for g in self.genes))
+
+    key = property(lambda self: self._key(),
+                   doc='hashable structure of the evaluated regions')
+    
     
     @cache
     def __repr__(self):
@@ -212,10 +338,70 @@ class Chromosome(object):
         '''
         return self.linker(*[g.eval(df) for g in self.genes])
     
+    def reduceFitnesses(self, df):
+        '''
+        computes the declared objectives in one pass over df, the roots of
+        the genes linked by the default linker are fused with the
+        reducers, thus the predictions are not materialized. The fitnesses
+        are inf if the chromosome raises a numeric error.
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, data set
+        @return: tuple, fitnesses of the chromosome
+        '''
+        try:
+            if self.linker is defaultLinker:
+                result = self.linker(*[g.evalRoot(df) for g in self.genes])
+            else:
+                result = self.eval(df)
+            return self._fitnessesFinish(
+                self._fitnessesChunk(self._fitnessesStart(), result, df))
+        except (ArithmeticError, ValueError):
+            # e.g. math domain error, overflow, np.seterr(all='raise')
+            return (float('inf'),) * len(self.objectives)
+
     def _fitnesses(self):
-        '''fitness function'''
+        '''
+        fitness function, the declared objectives are computed by the
+        evaluators (PyMOGEP.evaluator) against their data set instead.
+        '''
+        if self.objectives:
+            raise RuntimeError('the declared objectives are computed by '
+                               'reduceFitnesses(df) of the evaluator')
         raise NotImplementedError('Must override Chromosome._fitness function')
 
+    def _fitnessesStart(self):
+        '''
+        the chunked evaluation (PyMOGEP.evaluator.ChunkedEvaluator) 
+        accumulates the objectives chunk by chunk instead of calling
+        _fitnesses.
+        @return: initial state of the accumulated objectives
+        '''
+        if self.objectives:
+            return [obj.start() for obj in self.objectives]
+        raise NotImplementedError(
+            'Must override Chromosome._fitnessesStart for chunked evaluation')
+    
+    def _fitnessesChunk(self, state, result, chunk):
+        '''
+        @param state: accumulated objectives of the previous chunks
+        @param result: results of evaluating the chromosome against the chunk
+        @param chunk: pandas.DataFrame, rows of the data set
+        @return: state after accumulating the chunk
+        '''
+        if self.objectives:
+            return objective.accumulate(self.objectives, state, result, chunk)
+        raise NotImplementedError(
+            'Must override Chromosome._fitnessesChunk for chunked evaluation')
+    
+    def _fitnessesFinish(self, state):
+        '''
+        @param state: accumulated objectives of all chunks
+        @return: tuple, fitnesses of the chromosome
+        '''
+        if self.objectives:
+            return tuple(obj.finish(objState) for obj, objState in 
+                         zip(self.objectives, state))
+        return tuple(state)
+
     def _solved(self):
         '''
         It can be override by user-defined function
@@ -224,3 +410,22 @@ class Chromosome(object):
         return False
 
 
+
+
+class CompactChromosome(Chromosome):
+    '''
+    chromosome without instance __dict__, and its genes store the alleles
+    as small integer codes (PyMOGEP.gene.CompactGene). 
+    
+    The subclasses get an empty __slots__ from MetaChromosome unless they
+    define one, thus a user defined subclass can not hold attributes
+    other than the ones of Chromosome.
+    '''
+    __slots__ = ()
+    compact = True
+    gene_type = CompactGene
+
+
+class CompactPrefixChromosome(CompactChromosome):
+    '''compact chromosome of prefix genes'''
+    gene_type = CompactPrefixGene
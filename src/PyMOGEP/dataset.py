@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+columnar data set (Dataset) used in place of pandas.DataFrame as the
+training and validation data of the population.
+
+readers streaming a data set in fixed-size row chunks, for the chunked
+evaluation (PyMOGEP.evaluator.ChunkedEvaluator) of data sets larger than
+the memory. A reader can be iterated many times (once per generation),
+and each iteration yields the chunks as pandas.DataFrame (or Dataset for
+DatasetChunks).
+'''
+import os
+import numpy as np
+import pandas as pd
+
+__all__ = ['Dataset', 'DataFrameChunks', 'DatasetChunks', 'NpyChunks', 
+           'CsvChunks', 'columnArrays']
+
+
+class Dataset(object):
+    '''
+    each column of the data set is a contiguous float64 array, stored as a
+    row of the (n_columns, n_rows) array values, thus dataset[name] is an 
+    array lookup without pandas indexing. The rows of the columns are
+    resolved once when the data set is built (arrays), and the programs
+    load their variables from arrays directly (columnArrays).
+    
+    a data set saved by Dataset.save() is memory-mapped by Dataset.load(),
+    and a memory-mapped data set is pickled by its path, hence the worker
+    processes map the same file instead of receiving a copy.
+    '''
+
+    def __init__(self, values, columns, path=None, rows=None):
+        '''
+        @param values: float array (n_columns, n_rows)
+        @param columns: list of column names
+        @param path: string, directory of the memory-mapped values, or None
+        @param rows: (start, stop) of the rows of the mapped values, or None
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        assert values.ndim == 2 and len(values) == len(columns)
+        self.values = values
+        self.columns = tuple(columns)
+        self._columnIndex = dict((name, idx) for idx, name in 
+                                 enumerate(self.columns))
+        # column name -> view of its row in values
+        self.arrays = dict((name, np.asarray(values[idx])) 
+                           for idx, name in enumerate(self.columns))
+        self.path = path
+        self._rows = rows
+
+
+    @classmethod
+    def fromDataFrame(cls, df, columns=None):
+        '''
+        @param df: pandas.DataFrame
+        @param columns: list of column names, default is all columns
+        @return: Dataset, copy of the columns of df
+        '''
+        columns = list(df.columns if columns is None else columns)
+        values = np.empty((len(columns), len(df)))
+        for idx, name in enumerate(columns):
+            values[idx] = np.asarray(df[name], dtype=np.float64)
+        return cls(values, columns)
+
+
+    def save(self, path):
+        '''
+        stores the data set in the directory path (values.npy, columns.txt)
+        @param path: string, directory of the data set
+        '''
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        np.save(os.path.join(path, 'values.npy'), self.values)
+        with open(os.path.join(path, 'columns.txt'), 'w') as fout:
+            fout.write('\n'.join(str(name) for name in self.columns))
+
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        @param path: string, directory of the data set
+        @param mmap: boolean, memory-mapping the values (read-only)
+        @return: Dataset
+        '''
+        with open(os.path.join(path, 'columns.txt')) as fin:
+            columns = fin.read().split('\n')
+        values = np.load(os.path.join(path, 'values.npy'), 
+                         mmap_mode='r' if mmap else None)
+        return cls(values, columns, path if mmap else None)
+
+
+    def columnIndices(self, names):
+        '''
+        @param names: list of column names
+        @return: tuple, index of each column in values
+        '''
+        missing = [name for name in names if name not in self._columnIndex]
+        if missing:
+            raise KeyError('columns %s are not in the data set'%(missing,))
+        return tuple(self._columnIndex[name] for name in names)
+
+
+    def rows(self, start, stop):
+        '''@return: Dataset, view of the rows [start, stop)'''
+        start, stop, _ = slice(start, stop).indices(len(self))
+        rows = None
+        if self.path is not None:
+            offset = self._rows[0] if self._rows else 0
+            rows = (offset + start, offset + stop)
+        return Dataset(self.values[:, start: stop], self.columns, 
+                       self.path, rows)
+
+
+    def toDataFrame(self):
+        '''@return: pandas.DataFrame, copy of the data set'''
+        return pd.DataFrame(dict(zip(self.columns, self.values)),
+                            columns=self.columns)
+
+
+    index = property(lambda self: np.arange(len(self)),
+                     doc='row numbers, as pandas.DataFrame.index')
+
+
+    def __getstate__(self):
+        '''the memory-mapped data set is pickled by its path'''
+        if self.path is not None:
+            return {'path': self.path, 'rows': self._rows}
+        return {'values': np.asarray(self.values), 'columns': self.columns}
+
+
+    def __setstate__(self, state):
+        if 'path' in state:
+            dataset = Dataset.load(state['path'])
+            if state['rows'] is not None:
+                dataset = dataset.rows(*state['rows'])
+            self.__dict__.update(dataset.__dict__)
+        else:
+            self.__init__(state['values'], state['columns'])
+
+
+    def __getitem__(self, name):
+        '''@return: float array, values of the column'''
+        return self.arrays[name]
+
+
+    def __contains__(self, name):
+        return name in self._columnIndex
+
+
+    def __len__(self):
+        '''@return: number of rows'''
+        return self.values.shape[1]
+
+
+def columnArrays(df, names):
+    '''
+    @param df: pandas.DataFrame or Dataset
+    @param names: iterable of column names
+    @return: dict, column name -> float array of the column, the arrays of
+             a Dataset (Dataset.arrays) are returned as they are
+    '''
+    if isinstance(df, Dataset):
+        return df.arrays
+    return dict((name, np.asarray(df[name])) for name in names)
+
+
+class DataFrameChunks(object):
+    '''row chunks of a pandas.DataFrame in memory'''
+
+    def __init__(self, df, chunkSize):
+        '''
+        @param df: pandas.DataFrame, data set
+        @param chunkSize: positive integer, number of rows of a chunk
+        '''
+        assert chunkSize > 0
+        self.df = df
+        self.chunkSize = chunkSize
+
+
+    def __iter__(self):
+        for start in xrange(0, len(self.df), self.chunkSize):
+            yield self.df.iloc[start: start + self.chunkSize]
+
+
+class DatasetChunks(object):
+    '''row chunks (views) of a Dataset'''
+
+    def __init__(self, dataset, chunkSize):
+        '''
+        @param dataset: PyMOGEP.dataset.Dataset
+        @param chunkSize: positive integer, number of rows of a chunk
+        '''
+        assert chunkSize > 0
+        self.dataset = dataset
+        self.chunkSize = chunkSize
+
+
+    def __iter__(self):
+        for start in xrange(0, len(self.dataset), self.chunkSize):
+            yield self.dataset.rows(start, start + self.chunkSize)
+
+
+class NpyChunks(object):
+    '''
+    row chunks of memory-mapped .npy files, only the rows of the current
+    chunk are read from the disk.
+    '''
+
+    def __init__(self, source, chunkSize, columns=None):
+        '''
+        @param source: string, path of a 2-D .npy file of shape
+                       (n_rows, len(columns)), or dict, column name -> path
+                       of a 1-D .npy file, the files have the same length
+        @param chunkSize: positive integer, number of rows of a chunk
+        @param columns: list of column names of the 2-D .npy file
+        '''
+        assert chunkSize > 0
+        assert isinstance(source, dict) or columns is not None
+        self.source = source
+        self.chunkSize = chunkSize
+        self.columns = list(columns) if columns is not None else None
+
+
+    def __iter__(self):
+        if isinstance(self.source, dict):
+            arrays = dict((column, np.load(path, mmap_mode='r'))
+                          for column, path in self.source.iteritems())
+            n_rows = len(arrays.itervalues().next())
+            assert all(len(arr) == n_rows for arr in arrays.itervalues())
+            for start in xrange(0, n_rows, self.chunkSize):
+                stop = start + self.chunkSize
+                yield pd.DataFrame(dict((column, arr[start: stop])
+                                        for column, arr in arrays.iteritems()),
+                                   index=np.arange(start, min(stop, n_rows)))
+        else:
+            arr = np.load(self.source, mmap_mode='r')
+            assert arr.ndim == 2 and arr.shape[1] == len(self.columns)
+            for start in xrange(0, len(arr), self.chunkSize):
+                stop = min(start + self.chunkSize, len(arr))
+                yield pd.DataFrame(np.asarray(arr[start: stop]),
+                                   index=np.arange(start, stop),
+                                   columns=self.columns, copy=False)
+
+
+class CsvChunks(object):
+    '''row chunks of a csv file read by pandas.read_csv'''
+
+    def __init__(self, path, chunkSize, **kwargs):
+        '''
+        @param path: string, path of the csv file
+        @param chunkSize: positive integer, number of rows of a chunk
+        @param kwargs: keyword arguments of pandas.read_csv
+        '''
+        assert chunkSize > 0
+        self.path = path
+        self.chunkSize = chunkSize
+        self.kwargs = kwargs
+
+
+    def __iter__(self):
+        for chunk in pd.read_csv(self.path, chunksize=self.chunkSize,
+                                 **self.kwargs):
+            yield chunk
@@ -22,18 +22,46 @@ def symbol(sym):
     return decorator
 
 
+def ufunc(uf):
+    '''
+    Decorator that assigns the numpy ufunc computing a function to it, 
+    the ufunc is stored in the function.ufunc attribute, and it is called 
+    with out= by the evaluators writing the results in place.
+    @param uf: numpy.ufunc, giving the same results as the function for
+               float arrays
+    '''
+    def decorator(func):
+        '''
+        Attaches a ufunc to a function as its 'ufunc' attribute
+        @param func: function to decorate
+        '''
+        func.ufunc = uf
+        return func
+    return decorator
+
+
+def cacheName(funcName):
+    '''
+    @return: name of the attribute holding the cached result of a method,
+             the underscores around funcName are stripped, thus the name
+             can be listed in __slots__ without name mangling.
+    '''
+    return '_%s_cache' %(funcName.strip('_'))
+
+
 def cache(func):
     ''' 
     cache result of the class member method which has no argument.
     The return value is cached on self._{method}_cache where 
-    {method} is the name of the method.
+    {method} is the name of the method without the surrounding underscores,
+    a class defining __slots__ must list the attribute.
     usage:
         @cache
         def _get_something(self):
             ...
             return 'something'
     '''
-    cache_name = '_%s_cache' %(func.func_name)
+    cache_name = cacheName(func.func_name)
 
     @functools.wraps(func)
     def decorator(self):
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+fitness evaluators of the population.
+
+an evaluator fills the fitness cache of the chromosomes which have not
+been evaluated yet, the population calls evaluator.evaluate(chromosomes, df)
+after the chromosomes are produced.
+'''
+from collections import defaultdict
+import numpy as np
+from PyMOGEP.decorator import cacheName
+from PyMOGEP.dataset import columnArrays
+from PyMOGEP.program import (FUNCTION, VARIABLE, NUMBER, RNC)
+
+__all__ = ['Evaluator', 'BatchEvaluator', 'ChunkedEvaluator', 'ArenaEvaluator']
+
+
+def isEvaluated(chro):
+    '''@return: True if the fitnesses of the chromosome are cached'''
+    return hasattr(chro, cacheName('_fitnesses'))
+
+
+def _distinctGenes(chromosomes):
+    '''@return: list of the distinct gene objects of the chromosomes'''
+    genes, geneIDs = [], set()
+    for chro in chromosomes:
+        for gene in chro.genes:
+            if id(gene) not in geneIDs:
+                geneIDs.add(id(gene))
+                genes.append(gene)
+    return genes
+
+
+def _evalFitnesses(chro, df):
+    '''
+    fills the fitness cache of the chromosome, the declared objectives 
+    (Chromosome.objectives) are reduced against df in one pass, else the 
+    _fitnesses function is called.
+    '''
+    if chro.objectives and df is not None and not isEvaluated(chro):
+        setattr(chro, cacheName('_fitnesses'), chro.reduceFitnesses(df))
+    return chro.fitnesses
+
+
+class Evaluator(object):
+    '''evaluates the chromosomes one by one in the main process'''
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame, training data set
+        '''
+        for chro in chromosomes:
+            _evalFitnesses(chro, df)
+
+
+class BatchEvaluator(Evaluator):
+    '''
+    evaluates the genes of many chromosomes in one pass.
+
+    every node of the pending genes owns a row of a (n_nodes, n_rows) value
+    table. The nodes are grouped by (height, function), and each group is
+    computed by one numpy call over the rows of its arguments,
+    thus the number of python calls per batch depends on the number of
+    distinct (height, function) pairs, not on the population size.
+
+    the results are stored in the genes by Gene.setResult(), and the
+    user defined _fitnesses functions get them by Chromosome.eval(df).
+    '''
+
+    def __init__(self, batchSize=256):
+        '''
+        @param batchSize: positive integer, number of chromosomes evaluated
+                          in one pass, the value table of a pass requires
+                          about 8 * batchSize * n_genes * evalLength * n_rows
+                          bytes.
+        '''
+        assert batchSize > 0
+        self.batchSize = batchSize
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame, training data set
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+
+        for start in xrange(0, len(pending), self.batchSize):
+            batch = pending[start: start + self.batchSize]
+            genes = _distinctGenes(batch)
+
+            if df is not None:
+                self._evalGenes(genes, df)
+            for chro in batch:
+                _evalFitnesses(chro, df)
+            for gene in genes:
+                gene.setResult(None, None)
+
+
+    def _evalGenes(self, genes, df):
+        '''
+        computes the results of the genes against df, and stores them
+        in the genes. The genes of a failed group (e.g. the function can not
+        be applied to 2-D arrays) are left to Gene.eval().
+        @param genes: list of PyMOGEP.gene
+        @param df, pandas.DataFrame, training data set
+        '''
+        programs = [gene.program for gene in genes]
+        offsets = np.cumsum([0] + [len(prog) for prog in programs])
+
+        # grouping nodes of all genes, the key of the leaf groups is
+        # (kind, name), and that of the function groups is (height, function)
+        leaves = defaultdict(list)     # (kind, value) -> [row,...]
+        groups = defaultdict(list)     # (height, func) -> [(geneIdx, reg),...]
+        for geneIdx, prog in enumerate(programs):
+            offset = offsets[geneIdx]
+            for reg, kind, value, args in prog.instructions:
+                if kind == FUNCTION:
+                    groups[prog.heights[reg], value].append((geneIdx, reg))
+                else:
+                    leaves[kind, value].append(offset + reg)
+
+        values = np.empty((offsets[-1], len(df)))
+        failed = set()     # index of failed genes
+        columns = columnArrays(df, [value for kind, value in leaves
+                                    if kind == VARIABLE])
+        for (kind, value), rows in leaves.iteritems():
+            if kind == VARIABLE:
+                values[rows] = columns[value]
+            else:
+                values[rows] = value
+
+        for (_, func), members in sorted(groups.iteritems(),
+                                         key=lambda item: item[0][0]):
+            rows = [offsets[geneIdx] + reg for geneIdx, reg in members]
+            try:
+                n_args = func.func_code.co_argcount
+                if n_args == 0:
+                    values[rows] = func()
+                else:
+                    argRows = [[offsets[geneIdx] + 
+                                programs[geneIdx].children[reg][argIdx]
+                                for geneIdx, reg in members]
+                               for argIdx in xrange(n_args)]
+                    values[rows] = func(*[values[arg] for arg in argRows])
+            except Exception:
+                failed.update(geneIdx for geneIdx, _ in members)
+
+        for geneIdx, gene in enumerate(genes):
+            # the gene rooted at a constant returns a scalar in Gene.eval()
+            reg, kind, value, args = programs[geneIdx].instructions[-1]
+            if (kind == FUNCTION and not args) or kind == RNC:
+                continue
+            if geneIdx not in failed:
+                gene.setResult(df, values[offsets[geneIdx]])
+
+
+class ChunkedEvaluator(BatchEvaluator):
+    '''
+    evaluates the chromosomes against a data set streamed in row chunks
+    (PyMOGEP.dataset), which may be larger than the memory.
+
+    each chunk is read once per call, and the objectives of all pending
+    chromosomes are accumulated chunk by chunk by the reducer hooks of
+    the chromosome class: _fitnessesStart(), _fitnessesChunk(state, result,
+    chunk) and _fitnessesFinish(state), the _fitnesses function is not used.
+    A chromosome of declared objectives raising a numeric error is skipped
+    in the remaining chunks and its fitnesses are inf, as those of
+    Chromosome.reduceFitnesses.
+    '''
+
+    def __init__(self, reader=None, batchSize=None):
+        '''
+        @param reader: iterable of the data chunks (pandas.DataFrame), default
+                       is the data set given to evaluate(), which must be
+                       an iterable of chunks, e.g. PyMOGEP.dataset.NpyChunks
+        @param batchSize: positive integer or None, if given, the genes of
+                          batchSize chromosomes are computed in one pass
+                          against each chunk (BatchEvaluator)
+        '''
+        assert batchSize is None or batchSize > 0
+        self.reader = reader
+        self.batchSize = batchSize
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, iterable of the data chunks, used if no reader is given
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+        if not pending:
+            return
+
+        batchSize = self.batchSize if self.batchSize else len(pending)
+        states = [chro._fitnessesStart() for chro in pending]
+        failed = set()     # index of the chromosomes raising numeric errors
+        reader = self.reader if self.reader is not None else df
+        for chunk in reader:
+            for start in xrange(0, len(pending), batchSize):
+                batch = [(idx, chro) for idx, chro in 
+                         enumerate(pending[start: start + batchSize], start)
+                         if idx not in failed]
+                genes = _distinctGenes([chro for _, chro in batch])
+                if self.batchSize:
+                    self._evalGenes(genes, chunk)
+                for idx, chro in batch:
+                    try:
+                        states[idx] = chro._fitnessesChunk(
+                                        states[idx], chro.eval(chunk), chunk)
+                    except (ArithmeticError, ValueError):
+                        # e.g. math domain error, overflow, 
+                        # np.seterr(all='raise')
+                        if not chro.objectives:
+                            raise
+                        failed.add(idx)
+                # the results of the chunk are released
+                for gene in genes:
+                    gene.setResult(None, None)
+
+        name = cacheName('_fitnesses')
+        for idx, (chro, state) in enumerate(zip(pending, states)):
+            if idx in failed:
+                setattr(chro, name, (float('inf'),) * len(chro.objectives))
+            else:
+                setattr(chro, name, chro._fitnessesFinish(state))
+
+
+class ArenaEvaluator(Evaluator):
+    '''
+    evaluates the genes in a reusable scratch arena of float64 buffers of
+    the length of the data set.
+
+    each function node with a ufunc attribute (PyMOGEP.decorator.ufunc)
+    writes its result by ufunc(..., out=buffer) into the buffer of its
+    first computed argument, or into a free buffer, and the buffers of
+    the other arguments are released, thus the arena grows to the
+    maximum number of live nodes of the population (about the eval depth
+    of the genes) and it is not allocated again in later generations.
+    The functions without ufunc, or with arguments which are not float64
+    arrays, are called as usual.
+
+    the results of the genes are buffers of the arena, they are valid
+    while the fitnesses of the chromosome are computed.
+    '''
+
+    def __init__(self):
+        self.arena = []      # list of float64 buffers
+        self._n_rows = None
+
+
+    def _allocate(self, free):
+        '''@return: index of a free buffer, the arena grows if it is full'''
+        if free:
+            return free.pop()
+        self.arena.append(np.empty(self._n_rows))
+        return len(self.arena) - 1
+
+
+    def _run(self, program, df, free):
+        '''
+        @param program: PyMOGEP.program.Program
+        @param df, data set of the program
+        @param free: list, indices of the free buffers
+        @return: result of the program, index of its buffer or None
+        '''
+        values, slots = {}, {}
+        shape = (self._n_rows, )
+        columns = columnArrays(df, program.variables)
+        for reg, kind, value, args in program.instructions:
+            if kind == FUNCTION:
+                argValues = [values.pop(arg) for arg in args]
+                owned = [slots.pop(arg) for arg in args if arg in slots]
+                uf = getattr(value, 'ufunc', None)
+                arrays = [val for val in argValues
+                          if isinstance(val, np.ndarray)]
+                if (uf is not None and arrays and
+                    all(arr.dtype == np.float64 and arr.shape == shape
+                        for arr in arrays)):
+                    slot = owned.pop(0) if owned else self._allocate(free)
+                    values[reg] = uf(*argValues, out=self.arena[slot])
+                    slots[reg] = slot
+                else:
+                    values[reg] = value(*argValues)
+                    for slot in owned:
+                        # the result may be a view of an argument
+                        if (isinstance(values[reg], np.ndarray) and
+                            np.may_share_memory(values[reg], self.arena[slot])):
+                            slots[reg] = slot
+                            owned.remove(slot)
+                            break
+                free.extend(owned)
+            elif kind == VARIABLE:
+                values[reg] = columns[value]
+            elif kind == NUMBER and reg == 0:
+                values[reg] = np.repeat(value, len(df))
+            else:
+                values[reg] = value
+        return values[0], slots.get(0)
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, training set
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+        if not pending or df is None:
+            Evaluator.evaluate(self, pending, df)
+            return
+
+        if len(df) != self._n_rows:
+            self.arena, self._n_rows = [], len(df)
+        for chro in pending:
+            free = range(len(self.arena))
+            genes = _distinctGenes([chro, ])
+            for gene in genes:
+                result, slot = self._run(gene.program, df, free)
+                if slot is not None:
+                    gene.setResult(df, result)
+            _evalFitnesses(chro, df)
+            for gene in genes:
+                gene.setResult(None, None)
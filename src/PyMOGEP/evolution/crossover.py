@@ -6,13 +6,16 @@
 
 return type of each method is list of the following format:
 (alleleIdx, [new allele1,new allele2,...])
+
+the random numbers are drawn from rng, the numpy.random.RandomState of the
+population, default is the global state of numpy.random.
 '''
-import random
+import numpy as np
 
 __all__ = ['crossoverPairs', 'crossoverOnePoint', 
            'crossoverTwoPoints', 'crossoverGene']
 
-def crossoverPairs(popSize, crossoverRate):
+def crossoverPairs(popSize, crossoverRate, rng=np.random):
     '''
     finding out which two chromosomes in the population should do 
     crossover operation
@@ -24,9 +27,8 @@ def crossoverPairs(popSize, crossoverRate):
     assert 0 < crossoverRate <= 1.
     
     if crossoverRate and popSize >= 2:
-        indices = [idx for idx in xrange(popSize) 
-                   if random.random() < crossoverRate]
-        random.shuffle(indices)
+        indices = rng.permutation(np.flatnonzero(
+                        rng.random_sample(popSize) < crossoverRate)).tolist()
         
         if len(indices) % 2: 
             indices = indices[:-1]
@@ -35,7 +37,7 @@ def crossoverPairs(popSize, crossoverRate):
             yield indices[idx], indices[idx+1]
           
 
-def crossoverOnePoint(chro1, chro2):
+def crossoverOnePoint(chro1, chro2, rng=np.random):
         '''
         Produces two children via one-point crossover
         it will not produce illegel genes.
@@ -47,8 +49,8 @@ def crossoverOnePoint(chro1, chro2):
         genes1, genes2 = list(chro1.genes), list(chro2.genes)
         
         # Pick a geneIdx and alleleIdx for crossover
-        geneIdx  = random.choice(xrange(len(genes1)))
-        alleleIdx = random.choice(xrange(len(genes1[geneIdx])))
+        geneIdx  = rng.randint(len(genes1))
+        alleleIdx = rng.randint(len(genes1[geneIdx]))
         
         # Construct new child genes
         child1 = genes1[geneIdx].modify([(alleleIdx, genes2[geneIdx][alleleIdx:])])
@@ -58,7 +60,7 @@ def crossoverOnePoint(chro1, chro2):
         return chro1.newInstance(genes1), chro2.newInstance(genes2)
 
 
-def crossoverTwoPoints(chro1, chro2):
+def crossoverTwoPoints(chro1, chro2, rng=np.random):
         '''
         Produces two children via two-point crossover
         it will not produce illegel genes.
@@ -74,7 +76,8 @@ def crossoverTwoPoints(chro1, chro2):
         genes1, genes2 = list(chro1.genes), list(chro2.genes)
 
         #start and stop index（on chromosome)
-        idx1, idx2 = random.sample(xrange(len(chro1)), 2)
+        idx1 = rng.randint(len(chro1))
+        idx2 = (idx1 + rng.randint(1, len(chro1))) % len(chro1)
         if idx1 > idx2:
             idx1, idx2 = idx2, idx1
         
@@ -100,7 +103,7 @@ def crossoverTwoPoints(chro1, chro2):
         return chro1.newInstance(genes1), chro2.newInstance(genes2)
 
 
-def crossoverGene(chro1, chro2):
+def crossoverGene(chro1, chro2, rng=np.random):
         '''
         Produces two children via full geneIdx crossover
         it will not produce illegel genes.
@@ -112,7 +115,7 @@ def crossoverGene(chro1, chro2):
         genes1, genes2 = list(chro1.genes), list(chro2.genes)
 
         # Choose a random geneIdx
-        geneIdx = random.choice(xrange(len(genes1)))
+        geneIdx = rng.randint(len(genes1))
         genes1[geneIdx], genes2[geneIdx] = genes2[geneIdx], genes1[geneIdx]
         return chro1.newInstance(genes1), chro2.newInstance(genes2)
 
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+genetic operators over the code matrix of the whole population.
+
+the population is encoded as an integer array of shape
+(popSize, n_genes, geneLength), the codes are the indices of the alleles in
+the alphabet of the chromosome class (functions, terminals, '?'), thus
+code < n_functions is a function. Each operator is applied to all
+chromosomes by numpy masks and fancy indexing, and only the heads are
+filled with functions, so it will not produce illegal genes.
+
+the RNC constants of the genes, an array of shape (popSize, n_genes,
+tailLength), follow the genes in the gene level operators, and the other
+operators keep the constants of the changed genes. Unlike Gene.modify()
+of the list operators, which draws new constants by the RNCGenerator
+when the evaluated region of a gene is changed, thus the two procedures
+differ on the chromosomes with RNC.
+
+each operator returns new arrays, the given arrays are not modified.
+the random numbers are drawn in bulk from rng, the numpy.random.RandomState
+of the population, default is the global state of numpy.random.
+'''
+import numpy as np
+from PyMOGEP.gene import CompactGene
+
+__all__ = ['encodePopulation', 'decodePopulation',
+           'matrixMutation', 'matrixInversion', 'matrixTransposeIS',
+           'matrixTransposeRIS', 'matrixTransposeGene', 'matrixCrossoverPairs',
+           'matrixCrossoverOnePoint', 'matrixCrossoverTwoPoints',
+           'matrixCrossoverGene']
+
+
+def encodePopulation(population):
+    '''
+    @param population: list of PyMOGEP.chromosome of the same class and shape
+    @return: codes, integer array (popSize, n_genes, geneLength)
+             Dc, float array (popSize, n_genes, tailLength) or None
+    '''
+    chroType = type(population[0])
+    index = chroType._alphabetIndex
+    n_genes, geneLength = len(population[0].genes), len(population[0].genes[0])
+    dtype = np.int8 if len(chroType.alphabet) <= 128 else np.int16
+    codes = np.empty((len(population), n_genes, geneLength), dtype=dtype)
+
+    for chroIdx, chro in enumerate(population):
+        for geneIdx, gene in enumerate(chro.genes):
+            if isinstance(gene, CompactGene):
+                codes[chroIdx, geneIdx] = gene.codes
+            else:
+                codes[chroIdx, geneIdx] = [index[allele] for allele in gene]
+
+    if not hasattr(population[0].genes[0], 'Dc'):
+        return codes, None
+
+    Dc = np.array([[gene.Dc for gene in chro.genes] for chro in population],
+                  dtype=np.float64)
+    return codes, Dc
+
+
+def decodePopulation(population, codes, Dc, newCodes, newDc):
+    '''
+    the genes whose codes and constants are not changed are kept, so are
+    their compiled programs and the unchanged chromosomes. The changed
+    genes get the constants of newDc, no constants are drawn.
+
+    @param population: list of PyMOGEP.chromosome
+    @param codes, Dc: return values of encodePopulation(population)
+    @param newCodes, newDc: results of the operators
+    @return: list of PyMOGEP.chromosome
+    '''
+    chroType = type(population[0])
+    alphabet = chroType.alphabet
+    changed = (codes != newCodes).any(axis=2)
+    if Dc is not None:
+        changed |= (Dc != newDc).any(axis=2)
+
+    nextPopulation = list(population)
+    chroIdxs, geneIdxs = np.nonzero(changed)
+    rows = newCodes[chroIdxs, geneIdxs].tolist()
+    genes = None
+    for idx, (chroIdx, geneIdx) in enumerate(zip(chroIdxs.tolist(), 
+                                                 geneIdxs.tolist())):
+        chro = population[chroIdx]
+        if genes is None:
+            genes = list(chro.genes)
+
+        gene = chro.gene_type([alphabet[code] for code in rows[idx]], 
+                              chro.headLength)
+        if newDc is not None:
+            constants = newDc[chroIdx, geneIdx]
+            gene.Dc = (constants.copy() if isinstance(gene, CompactGene)
+                       else constants.tolist())
+            gene.RNCGenerator = chro.RNCGenerator
+        genes[geneIdx] = gene
+
+        # np.nonzero lists the changed genes chromosome by chromosome
+        if idx + 1 == len(rows) or chroIdxs[idx + 1] != chroIdx:
+            nextPopulation[chroIdx] = chro.newInstance(genes)
+            genes = None
+    return nextPopulation
+
+
+def _selected(popSize, rate, rng):
+    '''@return: indices of the chromosomes chosen with probability rate'''
+    return np.flatnonzero(rng.random_sample(popSize) < rate)
+
+
+def _gather(arr, indices):
+    '''@return: arr[i, indices[i, j]] of each row i'''
+    return arr[np.arange(len(arr))[:, None], indices]
+
+
+def _swap(arr, rows1, rows2, mask):
+    '''exchanges the masked elements of arr[rows1] and arr[rows2] in place'''
+    arr1, arr2 = arr[rows1], arr[rows2]
+    arr[rows1] = np.where(mask, arr2, arr1)
+    arr[rows2] = np.where(mask, arr1, arr2)
+
+
+def matrixMutation(codes, mutationRate, headLength, n_functions, n_terminals,
+                   rng=np.random):
+    '''
+    multi-point mutation of every allele with probability mutationRate,
+    the head alleles are replaced by symbols and the tail alleles by
+    terminals.
+    @param codes: integer array (popSize, n_genes, geneLength)
+    @param headLength: integer, head length of the genes
+    @param n_functions, n_terminals: number of functions and terminals
+                                     of the chromosome class
+    @return: new codes
+    '''
+    popSize, n_genes, geneLength = codes.shape
+    mask = rng.random_sample(codes.shape) < mutationRate
+    alleles = np.empty_like(codes)
+    alleles[:, :, :headLength] = rng.randint(0,
+            n_functions + n_terminals, (popSize, n_genes, headLength))
+    alleles[:, :, headLength:] = n_functions + rng.randint(0,
+            n_terminals, (popSize, n_genes, geneLength - headLength))
+    return np.where(mask, alleles, codes)
+
+
+def matrixInversion(codes, inversionRate, headLength, rng=np.random):
+    '''
+    partial head inversion of a random gene of each chosen chromosome.
+    @return: new codes
+    '''
+    codes = codes.copy()
+    popSize, n_genes, geneLength = codes.shape
+    rows = _selected(popSize, inversionRate, rng)
+    if headLength < 2 or not len(rows):
+        return codes
+
+    geneIdx = rng.randint(0, n_genes, len(rows))
+    # two distinct points in [0, headLength]
+    idx1 = rng.randint(0, headLength + 1, len(rows))
+    idx2 = (idx1 + rng.randint(1, headLength + 1, len(rows))) % (
+                                                             headLength + 1)
+    idx1, idx2 = np.minimum(idx1, idx2)[:, None], np.maximum(idx1, idx2)[:, None]
+
+    pos = np.arange(geneLength)
+    inside = (pos >= idx1) & (pos < idx2)
+    source = np.where(inside, idx1 + idx2 - 1 - pos, pos)
+    codes[rows, geneIdx] = _gather(codes[rows, geneIdx], source)
+    return codes
+
+
+def matrixTransposeIS(codes, transposeISRate, headLength, lengths,
+                      rng=np.random):
+    '''
+    IS (insertion sequence) transposition, a sequence of a random gene
+    is inserted into the head of a random gene after the root, the
+    following head alleles are shifted and the last ones are dropped.
+    @param lengths: sequence lengths (typically 1, 2, or 3)
+    @return: new codes
+    '''
+    codes = codes.copy()
+    popSize, n_genes, geneLength = codes.shape
+    rows = _selected(popSize, transposeISRate, rng)
+    if headLength < 2 or not len(rows):
+        return codes
+
+    srcGeneIdx = rng.randint(0, n_genes, len(rows))
+    tgtGeneIdx = rng.randint(0, n_genes, len(rows))
+    length = np.asarray(lengths)[rng.randint(0, len(lengths), len(rows))]
+    start = rng.randint(0, geneLength, len(rows))
+    target = rng.randint(1, headLength, len(rows))
+    # truncate the sequence at the end of the source gene and the head
+    length = np.minimum(length, geneLength - start)
+    length = np.minimum(length, headLength - target)
+
+    pos = np.arange(headLength)
+    start, target, length = start[:, None], target[:, None], length[:, None]
+    fromSequence = (pos >= target) & (pos < target + length)
+    seqIdx = np.clip(start + pos - target, 0, geneLength - 1)
+    tgtIdx = np.where(pos < target, pos, np.clip(pos - length, 0, None))
+
+    source, tgt = codes[rows, srcGeneIdx], codes[rows, tgtGeneIdx]
+    codes[rows, tgtGeneIdx, :headLength] = np.where(fromSequence,
+                          _gather(source, seqIdx), _gather(tgt, tgtIdx))
+    return codes
+
+
+def matrixTransposeRIS(codes, transposeRISRate, headLength, lengths,
+                       n_functions, rng=np.random):
+    '''
+    RIS (root insertion sequence) transposition, a sequence starting with
+    a function in the head of a random gene is inserted at the root of a
+    random gene.
+    @param lengths: sequence lengths (typically 1, 2, or 3)
+    @param n_functions: number of functions of the chromosome class
+    @return: new codes
+    '''
+    codes = codes.copy()
+    popSize, n_genes, geneLength = codes.shape
+    rows = _selected(popSize, transposeRISRate, rng)
+    if not len(rows):
+        return codes
+
+    srcGeneIdx = rng.randint(0, n_genes, len(rows))
+    tgtGeneIdx = rng.randint(0, n_genes, len(rows))
+
+    # random function in the head of the source gene
+    isFunction = codes[rows, srcGeneIdx, :headLength] < n_functions
+    keys = np.where(isFunction, rng.random_sample(isFunction.shape), -1.)
+    valid = isFunction.any(axis=1)
+    rows, srcGeneIdx, tgtGeneIdx = (rows[valid], srcGeneIdx[valid],
+                                    tgtGeneIdx[valid])
+    start = keys[valid].argmax(axis=1)
+    if not len(rows):
+        return codes
+
+    length = np.asarray(lengths)[rng.randint(0, len(lengths), len(rows))]
+    length = np.minimum(length, headLength - start)
+
+    pos = np.arange(headLength)
+    start, length = start[:, None], length[:, None]
+    seqIdx = np.clip(start + pos, 0, geneLength - 1)
+    tgtIdx = np.clip(pos - length, 0, None)
+
+    source, tgt = codes[rows, srcGeneIdx], codes[rows, tgtGeneIdx]
+    codes[rows, tgtGeneIdx, :headLength] = np.where(pos < length,
+                          _gather(source, seqIdx), _gather(tgt, tgtIdx))
+    return codes
+
+
+def matrixTransposeGene(codes, Dc, transposeGeneRate, rng=np.random):
+    '''
+    gene transposition, a random gene is exchanged with the first gene.
+    @param Dc: float array (popSize, n_genes, tailLength) or None
+    @return: new codes, new Dc
+    '''
+    codes = codes.copy()
+    Dc = Dc.copy() if Dc is not None else None
+    popSize, n_genes, _ = codes.shape
+    rows = _selected(popSize, transposeGeneRate, rng)
+    if n_genes < 2 or not len(rows):
+        return codes, Dc
+
+    geneIdx = rng.randint(1, n_genes, len(rows))
+    for arr in (codes, Dc) if Dc is not None else (codes,):
+        first = arr[rows, 0].copy()
+        arr[rows, 0] = arr[rows, geneIdx]
+        arr[rows, geneIdx] = first
+    return codes, Dc
+
+
+def matrixCrossoverPairs(popSize, crossoverRate, rng=np.random):
+    '''
+    finding out which two chromosomes in the population should do
+    crossover operation
+    @return: two integer arrays, the i-th pair is (rows1[i], rows2[i])
+    '''
+    rows = rng.permutation(_selected(popSize, crossoverRate, rng))
+    n_pairs = len(rows) // 2
+    return rows[:n_pairs], rows[n_pairs: 2 * n_pairs]
+
+
+def matrixCrossoverOnePoint(codes, crossoverRate, rng=np.random):
+    '''
+    one-point crossover, the pair exchanges the alleles after a random
+    point of a random gene.
+    @return: new codes
+    '''
+    codes = codes.copy()
+    popSize, n_genes, geneLength = codes.shape
+    rows1, rows2 = matrixCrossoverPairs(popSize, crossoverRate, rng)
+
+    geneIdx = rng.randint(0, n_genes, len(rows1))
+    alleleIdx = rng.randint(0, geneLength, len(rows1))
+    mask = ((np.arange(n_genes) == geneIdx[:, None])[:, :, None] &
+            (np.arange(geneLength) >= alleleIdx[:, None])[:, None, :])
+    _swap(codes, rows1, rows2, mask)
+    return codes
+
+
+def matrixCrossoverTwoPoints(codes, crossoverRate, rng=np.random):
+    '''
+    two-point crossover, the pair exchanges the alleles between two random
+    points of the chromosome.
+    @return: new codes
+    '''
+    codes = codes.copy()
+    popSize, n_genes, geneLength = codes.shape
+    rows1, rows2 = matrixCrossoverPairs(popSize, crossoverRate, rng)
+    length = n_genes * geneLength
+    if length < 2:
+        return codes
+
+    idx1 = rng.randint(0, length, len(rows1))
+    idx2 = (idx1 + rng.randint(1, length, len(rows1))) % length
+    idx1, idx2 = np.minimum(idx1, idx2)[:, None], np.maximum(idx1, idx2)[:, None]
+    pos = np.arange(length)
+    mask = ((pos >= idx1) & (pos < idx2)).reshape(-1, n_genes, geneLength)
+    _swap(codes, rows1, rows2, mask)
+    return codes
+
+
+def matrixCrossoverGene(codes, Dc, crossoverRate, rng=np.random):
+    '''
+    gene crossover, the pair exchanges a random gene.
+    @param Dc: float array (popSize, n_genes, tailLength) or None
+    @return: new codes, new Dc
+    '''
+    codes = codes.copy()
+    Dc = Dc.copy() if Dc is not None else None
+    popSize, n_genes, _ = codes.shape
+    rows1, rows2 = matrixCrossoverPairs(popSize, crossoverRate, rng)
+
+    geneIdx = rng.randint(0, n_genes, len(rows1))
+    mask = (np.arange(n_genes) == geneIdx[:, None])[:, :, None]
+    _swap(codes, rows1, rows2, mask)
+    if Dc is not None:
+        _swap(Dc, rows1, rows2, mask)
+    return codes, Dc
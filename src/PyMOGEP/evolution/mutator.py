@@ -6,32 +6,46 @@
 
 return type of each method is list of the following format:
 (alleleIdx, [new allele1,new allele2,...])
+
+the random numbers are drawn from rng, the numpy.random.RandomState of the
+population, default is the global state of numpy.random.
 '''
 
-import random
+import numpy as np
 
 __all__ = ['mutation',]
 
-def mutation(chro, mutationRate):
+def mutation(chro, mutationRate, rng=np.random, draws=None):
     '''
     Produces a new chromosome via multi-point mutation on each
     index.  If nothing changes, the original chromosome is returned.
     
     @param chro: PyMOGEP.chromosome
     @param mutationRate, positive float
+    @param rng, numpy.random.RandomState
+    @param draws, float array (2, number of genes, gene length) or None,
+                  uniform random numbers of the masks and the choices of
+                  the alleles, e.g. a slice of the block drawn for the
+                  whole population, default is drawn from rng
     @return: new chromosome (or self)
     '''
     assert 0. < mutationRate <=1.
     genes = list(chro.genes)
     
+    # the masks and the choices of all alleles are drawn at once
+    if draws is None:
+        draws = rng.random_sample((2, len(chro.genes), len(chro.genes[0])))
+    masks, choices = (draws[0] < mutationRate).tolist(), draws[1].tolist()
     for geneIdx, gene in enumerate(chro.genes):
         changes = []
-        for alleleIdx, allele in enumerate(gene):
-            if random.random() < mutationRate:
+        for alleleIdx, (allele, mutated, choice) in enumerate(
+                        zip(gene, masks[geneIdx], choices[geneIdx])):
+            if mutated:
                 if alleleIdx >= chro.headLength:
-                    newAllele = random.choice(chro.terminals)
+                    alleles = chro.terminals
                 else:
-                    newAllele = random.choice(chro.symbols)
+                    alleles = chro.symbols
+                newAllele = alleles[int(choice * len(alleles))]
                 
                 # Only use this if the mutation actually did something
                 if newAllele != allele:
@@ -7,33 +7,40 @@
 multi-objective chromosome is not able to use roulette wheel method,
 using rank roulette wheeel or tournament
 '''
-import random, copy
+import copy
+import numpy as np
 from PyMOGEP.evolution.comparison import partialOrder
 
-def uniformSelection(population):
+def uniformSelection(population, rng=np.random):
     '''
     each chromosome has the same probability to be selected
     @param population, list of chromosome
+    @param rng, numpy.random.RandomState
     @return nextPopulation
     '''
     populationSize = len(population)
-    return [copy.deepcopy(population[random.randint(0, populationSize-1)]) 
-            for _ in xrange(populationSize)]
+    return [copy.deepcopy(population[idx]) for idx in 
+            rng.randint(0, populationSize, populationSize).tolist()]
      
 
-def binaryTournamentSelection(population):
+def binaryTournamentSelection(population, n_selected=None, rng=np.random):
     '''
     Two individuals are randomly chosen; 
     the fitter of the two is selected as a parent
     Note: utilizing fitnessesPartialOrder
     @param population, list of chromosome
+    @param n_selected, positive integer, number of the selected parents,
+                       default is the population size
+    @param rng, numpy.random.RandomState, the competitors of all 
+                tournaments are drawn at once
     '''
 #    print "tournament pop:", population
     populationSize = len(population)
-    offSpring = [None] * populationSize 
-    for idx in xrange(populationSize):
-        jdx = random.randint(0, populationSize-1)
-        kdx = random.randint(0, populationSize-1)
+    if n_selected is None:
+        n_selected = populationSize
+    offSpring = [None] * n_selected 
+    competitors = rng.randint(0, populationSize, (n_selected, 2)).tolist()
+    for idx, (jdx, kdx) in enumerate(competitors):
         #這邊必須使用copy, 否則nonDominatedSort會產生錯誤
         if partialOrder(population[jdx], population[kdx]):
             offSpring[idx] = copy.copy(population[jdx]) 
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+survival strategies choosing the chromosomes of the last (partially)
+selected front of the mixed population, the default strategy of
+PyMOGEP.population is the crowding distance of NSGA-II.
+
+NSGA-III reference point niching:
+K. Deb and H. Jain, "An Evolutionary Many-Objective Optimization Algorithm
+Using Reference-Point-Based Nondominated Sorting Approach, Part I: Solving
+Problems With Box Constraints," Evolutionary Computation, IEEE Transactions
+on, vol. 18, pp. 577-601, 2014.
+'''
+import numpy as np
+from PyMOGEP.sort.MatrixSort import fitnessMatrix
+
+__all__ = ['referencePoints', 'ReferencePointSurvival']
+
+
+def referencePoints(n_objectives, n_divisions):
+    '''
+    Das and Dennis's structured points on the unit simplex
+    @param n_objectives: positive integer
+    @param n_divisions: positive integer, number of divisions of each axis
+    @return: float array (C(n_objectives+n_divisions-1, n_divisions),
+             n_objectives)
+    '''
+    def compositions(total, n_parts):
+        if n_parts == 1:
+            yield (total,)
+            return
+        for first in xrange(total, -1, -1):
+            for rest in compositions(total - first, n_parts - 1):
+                yield (first,) + rest
+
+    return np.array(list(compositions(n_divisions, n_objectives)),
+                    dtype=np.float64) / n_divisions
+
+
+class ReferencePointSurvival(object):
+    '''
+    NSGA-III survival, the fitnesses are normalized by the ideal point and
+    the intercepts of the hyperplane of the extreme points, and each
+    chromosome is associated with the reference direction of the minimum
+    perpendicular distance. The chromosomes of the last front are chosen
+    from the reference directions with the fewest associated chromosomes.
+
+    the time complexity is O(N * R * M) for N chromosomes, R reference
+    directions and M objectives.
+    '''
+
+    def __init__(self, n_divisions=None, refPoints=None, chunkSize=1024,
+                 rng=None):
+        '''
+        @param n_divisions: positive integer or None, divisions of the
+                            reference points, default is the smallest one
+                            giving at least popSize reference points
+        @param refPoints: float array (R, M) or None, user specified
+                          reference points
+        @param chunkSize: positive integer, number of chromosomes
+                          associated at once, for bounding the memory
+        @param rng: numpy.random.RandomState or None, random generator of
+                    the niching, default is the rng of the population
+                    (PyMOGEP.population), or the global state of
+                    numpy.random out of a population
+        '''
+        self.n_divisions = n_divisions
+        self.refPoints = refPoints
+        self.chunkSize = chunkSize
+        self.rng = rng
+        # (n_objectives, popSize) -> generated reference points
+        self._generated = {}
+
+
+    def _referencePoints(self, n_objectives, popSize):
+        '''
+        @return: float array (R, M), the user specified reference points, 
+                 or the generated ones of the number of objectives and 
+                 the population size
+        '''
+        if self.refPoints is not None:
+            assert self.refPoints.shape[1] == n_objectives
+            return self.refPoints
+
+        key = (n_objectives, popSize)
+        if key not in self._generated:
+            n_divisions = self.n_divisions
+            if n_divisions is None:
+                n_divisions, n_points = 1, n_objectives
+                while n_points < popSize:
+                    n_divisions += 1
+                    # C(M+p-1, p) = C(M+p-2, p-1) * (M+p-1) / p
+                    n_points = n_points * (n_objectives + n_divisions - 1
+                                           ) // n_divisions
+            self._generated[key] = referencePoints(n_objectives, n_divisions)
+        return self._generated[key]
+
+
+    def normalize(self, F):
+        '''
+        @param F: float array (N, M), fitness matrix (minimum is better)
+        @return: float array (N, M), the ideal point is the origin, and the
+                 intercepts of the hyperplane of the extreme points are 1
+        '''
+        F = F - F.min(axis=0)
+        M = F.shape[1]
+
+        # the extreme point of each axis minimizes the achievement
+        # scalarizing function max(f / w), w = e_j with the other weights 1e-6
+        weights = np.full((M, M), 1e-6)
+        np.fill_diagonal(weights, 1.)
+        extremes = np.array([F[(F / weight).max(axis=1).argmin()]
+                             for weight in weights])
+
+        try:
+            intercepts = 1. / np.linalg.solve(extremes, np.ones(M))
+        except np.linalg.LinAlgError:
+            intercepts = None
+        if (intercepts is None or not np.isfinite(intercepts).all()
+            or (intercepts <= 1e-10).any()):
+            # degenerated hyperplane, using the worst values
+            intercepts = F.max(axis=0)
+        intercepts[intercepts <= 1e-10] = 1.
+        return F / intercepts
+
+
+    def associate(self, F, refPoints):
+        '''
+        @param F: float array (N, M), normalized fitness matrix
+        @param refPoints: float array (R, M)
+        @return: integer array (N,), index of the nearest reference direction
+                 float array (N,), perpendicular distance to the direction
+        '''
+        directions = refPoints / np.linalg.norm(refPoints, axis=1)[:, None]
+        niches = np.empty(len(F), dtype=np.int64)
+        distances = np.empty(len(F))
+        for start in xrange(0, len(F), self.chunkSize):
+            chunk = F[start: start + self.chunkSize]
+            # squared distance = |f|^2 - (f . d)^2
+            projections = chunk.dot(directions.T)
+            squared = ((chunk ** 2).sum(axis=1)[:, None] - projections ** 2)
+            rows = np.arange(len(chunk))
+            niches[start: start + len(chunk)] = nearest = squared.argmin(axis=1)
+            distances[start: start + len(chunk)] = np.sqrt(
+                np.maximum(squared[rows, nearest], 0.))
+        return niches, distances
+
+
+    def select(self, ParetoFronts, lastFront, n_remaining):
+        '''
+        @param ParetoFronts: list of the selected fronts
+        @param lastFront: the front which is partially selected
+        @param n_remaining: positive integer, number of the chromosomes
+                            chosen from lastFront
+        @return: list of the chosen chromosomes of lastFront
+        '''
+        selected = [chro for front in ParetoFronts for chro in front]
+        F = fitnessMatrix(selected + lastFront)
+        refPoints = self._referencePoints(F.shape[1],
+                                          len(selected) + n_remaining)
+        niches, distances = self.associate(self.normalize(F), refPoints)
+
+        nicheCounts = np.bincount(niches[:len(selected)],
+                                  minlength=len(refPoints))
+        lastNiches = niches[len(selected):]
+        lastDistances = distances[len(selected):]
+
+        # the members of the last front of each niche, the nearest first
+        order = np.lexsort((lastDistances, lastNiches))
+        members = {}
+        for idx in order.tolist():
+            members.setdefault(lastNiches[idx], []).append(idx)
+
+        # the niches without members are excluded
+        excluded = np.iinfo(nicheCounts.dtype).max
+        counts = np.full(len(refPoints), excluded, dtype=nicheCounts.dtype)
+        occupied = np.fromiter(members.iterkeys(), dtype=np.int64)
+        counts[occupied] = nicheCounts[occupied]
+
+        rng = self.rng if self.rng is not None else np.random
+        chosen = []
+        while len(chosen) < n_remaining:
+            niche = rng.choice(np.flatnonzero(counts == counts.min()))
+            nicheMembers = members[niche]
+            if counts[niche] == 0:
+                chosen.append(nicheMembers.pop(0))
+            else:
+                chosen.append(nicheMembers.pop(
+                                rng.randint(len(nicheMembers))))
+            counts[niche] = counts[niche] + 1 if nicheMembers else excluded
+        return [lastFront[idx] for idx in chosen]
@@ -7,13 +7,16 @@
 
 return type of each method is list of the following format:
 (alleleIdx, [new allele1,new allele2,...])
+
+the random numbers are drawn from rng, the numpy.random.RandomState of the
+population, default is the global state of numpy.random.
 '''
-import random
+import numpy as np
 
 __all__ = ['inversion', 'transposeIS', 'transposeRIS', 'transposeGene']
 
 
-def inversion(chro, inversionRate):
+def inversion(chro, inversionRate, rng=np.random):
     '''
     Produces a new chromosome via partial head inversion
     it will not produce illegel genes.
@@ -24,13 +27,15 @@ def inversion(chro, inversionRate):
     '''
     assert 0< inversionRate <=1.
     
-    if chro.headLength < 2 or random.random() >= inversionRate: 
+    if chro.headLength < 2 or rng.random_sample() >= inversionRate: 
         return chro
     
     genes = list(chro.genes)
 
-    geneIdx = random.choice(xrange(len(chro.genes)))
-    idx1, idx2 = random.sample(xrange(chro.headLength+1), 2)
+    geneIdx = rng.randint(len(chro.genes))
+    # two distinct points in [0, headLength]
+    idx1 = rng.randint(chro.headLength+1)
+    idx2 = (idx1 + rng.randint(1, chro.headLength+1)) % (chro.headLength+1)
     if idx1 > idx2:
         idx1, idx2 = idx2, idx1
 
@@ -39,7 +44,7 @@ def inversion(chro, inversionRate):
     return chro.newInstance(genes)
 
 
-def transposeIS(chro, length, transposeISRate):
+def transposeIS(chro, length, transposeISRate, rng=np.random):
     '''
     Produces a new chromosome via IS (insertion sequence) transposition
     copy a randomly chosen seq. from idx1 with given length, 
@@ -50,22 +55,22 @@ def transposeIS(chro, length, transposeISRate):
     '''
     assert 0 < transposeISRate <=1.
     
-    if chro.headLength < 2 or random.random() >= transposeISRate:
+    if chro.headLength < 2 or rng.random_sample() >= transposeISRate:
         return chro
    
     # Pick srcGeneIdx and tgtGeneIdx genes
     genes  = list(chro.genes)
     geneLength = len(genes)
-    srcGeneIdx = random.choice(xrange(geneLength))   
-    tgtGeneIdx = random.choice(xrange(geneLength))
+    srcGeneIdx = rng.randint(geneLength)   
+    tgtGeneIdx = rng.randint(geneLength)
 
     # Extract a transposition sequence.
-    idx1 = random.choice(xrange(geneLength))
+    idx1 = rng.randint(geneLength)
     idx2   = idx1 + length
     idx2   = chro.headLength if idx2 > chro.headLength else idx2
 
     #start idx of the tgtGeneIdx gene, but not the root
-    tgtIdx1 = random.choice(xrange(1, chro.headLength))
+    tgtIdx1 = rng.randint(1, chro.headLength)
 
     # Insert into the tgtGeneIdx gene's headLength
     changes = genes[srcGeneIdx][idx1:idx2][:chro.headLength-tgtIdx1] + \
@@ -74,31 +79,29 @@ def transposeIS(chro, length, transposeISRate):
     return chro.newInstance(genes)
 
 
-def transposeRIS(chro, length, transpositionRISRate):
+def transposeRIS(chro, length, transpositionRISRate, rng=np.random):
     '''
     Produces a new chro via RIS transposition
     @param length: sequence length (typically 1, 2, or 3)
     @return:       child chro
     '''
     assert transpositionRISRate
-    if random.random() >= transpositionRISRate:
+    if rng.random_sample() >= transpositionRISRate:
         return chro
     
     genes  = list(chro.genes)
     geneLength = len(genes)
-    srcGeneIdx = random.choice(xrange(geneLength))
-    tgtGeneIdx = random.choice(xrange(geneLength))
+    srcGeneIdx = rng.randint(geneLength)
+    tgtGeneIdx = rng.randint(geneLength)
     
     # Extract a transposition sequence. Truncate if required.
     # For RIS, the sequence must begin with a function.
-    try:
-        idx1 = random.choice(
-            [idx for idx in xrange(geneLength) 
-             if callable(genes[srcGeneIdx][idx])]
-        )
-    except IndexError: 
+    starts = [idx for idx in xrange(geneLength) 
+              if callable(genes[srcGeneIdx][idx])]
+    if not starts:
         # no functions after the idx1 of the source gene
         return chro
+    idx1 = starts[rng.randint(len(starts))]
     
     idx2 = idx1 + length
     idx2 = chro.headLength if idx2 > chro.headLength else idx2
@@ -111,7 +114,7 @@ def transposeRIS(chro, length, transpositionRISRate):
     return chro.newInstance(genes)
 
 
-def transposeGene(chro, transpositionGeneRate):
+def transposeGene(chro, transpositionGeneRate, rng=np.random):
     '''
     Produces a new chromosome via gene transposition
     @return: child chromosome
@@ -120,11 +123,11 @@ def transposeGene(chro, transpositionGeneRate):
     if len(chro.genes) < 2:
         return chro
     
-    if random.random() >= transpositionGeneRate:
+    if rng.random_sample() >= transpositionGeneRate:
         return chro
     else:
         genes = list(chro.genes)
-        idx = random.randint(1, len(genes)-1)
+        idx = rng.randint(1, len(genes))
         
         # Switch these genes
         genes[0], genes[idx] = genes[idx], genes[0]
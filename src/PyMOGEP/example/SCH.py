@@ -20,6 +20,8 @@ optimal solution: x in [0, 2]
 from PyMOGEP.chromosome import Chromosome
 from PyMOGEP.population import Population
 from PyMOGEP.gene import PrefixGene
+from PyMOGEP import dataset
+from PyMOGEP.objective import SumAbsoluteError
 from PyMOGEP.function.arithmetic import *
 from PyMOGEP.evolution.linker import *
 import pandas as pd
@@ -36,7 +38,8 @@ def Dataset(n_data=1000):
     x = (upper-lower) * np.random.random((n_data)) + lower
     f1 = func1(x)
     f2 = func2(x)
-    return pd.DataFrame.from_dict({"x": x, "f1": f1, "f2": f2}) 
+    return dataset.Dataset.fromDataFrame(
+                pd.DataFrame.from_dict({"x": x, "f1": f1, "f2": f2}))
 
 
 class SymbolicRegression(Chromosome):
@@ -44,21 +47,9 @@ class SymbolicRegression(Chromosome):
     functions = op_add, op_multiply, op_substract
     terminals = 'x', 
 
-    def _fitnesses(self):
-        '''fitness function'''
-
-        # Evaluation of this chromosome
-        guess = self.eval(Population.df)
-
-        try:
-            error = ( np.sum(np.abs(guess[0] - Population.df['f1'])),
-                      np.sum(np.abs(guess[1] - Population.df['f2']))
-                      )
-            return error
-        
-        except Exception:
-            return (float('inf'), float('inf'))
-        
+    # sum of the absolute errors of each gene against its target
+    objectives = (SumAbsoluteError('f1', 0), SumAbsoluteError('f2', 1))
+
     def _solved(self):
         '''termination condition'''
         return False
@@ -69,21 +60,9 @@ class PrefixSymbolicRegression(Chromosome):
     terminals = 'x',
     gene_type =  PrefixGene
 
-    def _fitnesses(self):
-        '''fitness function'''
-
-        # Evaluation of this chromosome
-        guess = self.eval(Population.df)
-
-        try:
-            error = ( np.sum(np.abs(guess[0] - Population.df['f1'])),
-                      np.sum(np.abs(guess[1] - Population.df['f2']))
-                      )
-            return error
-        
-        except Exception:
-            return (float('inf'), float('inf'))
-        
+    # sum of the absolute errors of each gene against its target
+    objectives = (SumAbsoluteError('f1', 0), SumAbsoluteError('f2', 1))
+
     def _solved(self):
         '''termination condition'''
         return False
@@ -94,7 +73,7 @@ def GEPAlgorithm(generations=10, popSize=500,
     df = Dataset(1000)
     t0 = time()
  
-    Population.df = df
+    Population.train_df = df
     pop = Population(chro, popSize, headLength, n_genes,
                    n_elites=1, RNCGenerator=np.random.randn, verbose=False)
     pop.solve(generations)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+numexpr backend of the gene evaluation (numexpr is optional,
+https://github.com/pydata/numexpr).
+
+the evaluated region of a gene is rendered into numexpr expressions by
+the symbols of its functions (PyMOGEP.decorator.symbol). The leaves of
+an expression are its inputs, named by their order in the expression,
+thus the genes of the same structure share one compiled expression
+whatever their constants are. numexpr computes an expression by blocks
+of rows in many threads, without the intermediate arrays of numpy.
+
+the functions without a numexpr template (e.g. division, comparisons,
+rounding) are computed by numpy, and the subtrees of their arguments are
+computed by numexpr separately.
+'''
+import numpy as np
+from PyMOGEP.dataset import columnArrays
+from PyMOGEP.evaluator import (Evaluator, isEvaluated, _distinctGenes,
+                                _evalFitnesses)
+from PyMOGEP.memory import LRUCache
+from PyMOGEP.program import (FUNCTION, VARIABLE)
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+__all__ = ['TEMPLATES', 'render', 'NumexprEvaluator']
+
+# kind of the steps computed by numexpr, after the kinds of PyMOGEP.program
+EXPRESSION = 4
+
+# symbol -> (number of arguments, numexpr template of the function), the
+# template gives the same results as the function of PyMOGEP.function
+# with this symbol for float arrays
+TEMPLATES = {
+    '+': (2, '({0} + {1})'),
+    '-': (2, '({0} - {1})'),
+    '*': (2, '({0} * {1})'),
+    '^': (2, '({0} ** {1})'),
+    '^2': (1, '({0} ** 2)'),
+    '^3': (1, '({0} ** 3)'),
+    '^-1': (1, '(1.0 / {0})'),
+    '10^': (1, '(10.0 ** {0})'),
+    'Q': (1, 'sqrt({0})'),
+    'Q3': (1, '({0} ** %r)'%(1./3)),
+    'LN': (1, 'log({0})'),
+    'LOG10': (1, 'log10({0})'),
+    'E^': (1, 'exp({0})'),
+    'ABS': (1, 'abs({0})'),
+    'SIN': (1, 'sin({0})'),
+    'COS': (1, 'cos({0})'),
+    'TAN': (1, 'tan({0})'),
+    'CSC': (1, '(1.0 / sin({0}))'),
+    'SEC': (1, '(1.0 / cos({0}))'),
+    'COT': (1, '(1.0 / tan({0}))'),
+    'ASIN': (1, 'arcsin({0})'),
+    'ACOS': (1, 'arccos({0})'),
+    'ATAN': (1, 'arctan({0})'),
+    'ACSC': (1, '(1.0 / arcsin({0}))'),
+    'ASEC': (1, '(1.0 / arccos({0}))'),
+    'ACOT': (1, '(1.0 / arctan({0}))'),
+    'SINH': (1, 'sinh({0})'),
+    'COSH': (1, 'cosh({0})'),
+    'TANH': (1, 'tanh({0})'),
+}
+
+
+def _template(func, n_args):
+    '''@return: numexpr template of the function, or None'''
+    n, template = TEMPLATES.get(getattr(func, 'symbol', None), (None, None))
+    return template if n_args and n == n_args else None
+
+
+def _expression(instructions, reg, inputs, names):
+    '''
+    renders the subtree rooted at reg, the leaves and the subtrees computed
+    by numpy are appended to inputs in order of appearance.
+    @param instructions: dict, register -> instruction of the program
+    @param inputs: list of (kind, value) of the inputs
+    @param names: dict, key of the input -> name in the expression
+    @return: string, numexpr expression
+    '''
+    _, kind, value, args = instructions[reg]
+    if kind == FUNCTION:
+        template = _template(value, len(args))
+        if template is not None:
+            return template.format(*[_expression(instructions, arg,
+                                                 inputs, names)
+                                     for arg in args])
+        key, item = (FUNCTION, reg), (FUNCTION, reg)
+    elif kind == VARIABLE:
+        key, item = (VARIABLE, value), (VARIABLE, value)
+    else:
+        # each constant is an input of its own
+        key, item = (None, reg), (None, value)
+
+    if key not in names:
+        names[key] = 'i%d'%len(inputs)
+        inputs.append(item)
+    return names[key]
+
+
+def render(program):
+    '''
+    @param program: PyMOGEP.program.Program
+    @return: list of steps in execution order, (register, FUNCTION,
+             function, argument registers) is computed by numpy,
+             (register, EXPRESSION, expression, inputs) is computed by
+             numexpr, where inputs are list of (VARIABLE, column name),
+             (FUNCTION, register) or (None, constant).
+             The list is empty if the root is not a function of arguments
+             or no function can be rendered.
+    '''
+    instructions = dict((inst[0], inst) for inst in program.instructions)
+    supported = lambda reg: (instructions[reg][1] == FUNCTION and
+                             _template(instructions[reg][2],
+                                       len(instructions[reg][3])))
+
+    steps = []
+    def expressionStep(reg):
+        inputs = []
+        text = _expression(instructions, reg, inputs, {})
+        steps.append((reg, EXPRESSION, text, inputs))
+
+    for reg, kind, value, args in program.instructions:
+        if kind != FUNCTION:
+            continue
+        if not supported(reg):
+            for arg in args:
+                if supported(arg):
+                    expressionStep(arg)
+            steps.append((reg, FUNCTION, value, args))
+        elif reg == 0:
+            expressionStep(reg)
+
+    root = instructions[0]
+    if (root[1] != FUNCTION or not root[3] or
+        all(step[1] == FUNCTION for step in steps)):
+        return []
+    return steps
+
+
+class NumexprEvaluator(Evaluator):
+    '''
+    evaluates the genes by numexpr, the compiled expressions are cached by
+    their text, which is the structure of the rendered subtree, and the
+    rendered steps are cached by the structure of the gene (Gene.key).
+
+    a gene is left to Gene.eval() (numpy) if it can not be rendered, or
+    an input of its expressions is not float64, or its evaluation fails.
+    the results of the numexpr functions may differ from those of numpy
+    in the last bits, and numexpr does not emit the floating point warnings.
+    '''
+
+    def __init__(self, n_threads=None, renderCacheSize=4096,
+                 exprCacheSize=4096):
+        '''
+        @param n_threads: positive integer or None, number of threads of
+                          numexpr (numexpr.set_num_threads), default is
+                          the setting of numexpr
+        @param renderCacheSize: positive integer, maximum number of the
+                                gene structures of the cached steps
+        @param exprCacheSize: positive integer, maximum number of the
+                              compiled expressions, the least recently
+                              used ones are released
+        '''
+        if numexpr is None:
+            raise ImportError('NumexprEvaluator requires numexpr')
+        if n_threads is not None:
+            numexpr.set_num_threads(n_threads)
+        # expression -> numexpr.NumExpr
+        self.compiled = LRUCache(exprCacheSize)
+        # Gene.key -> (steps, dict register -> instruction)
+        self.rendered = LRUCache(renderCacheSize)
+
+
+    def _compile(self, text, n_inputs):
+        '''@return: numexpr.NumExpr, the compiled expression'''
+        expr = self.compiled.get(text)
+        if expr is None:
+            signature = [('i%d'%idx, np.float64) for idx in xrange(n_inputs)]
+            expr = numexpr.NumExpr(text, signature)
+            self.compiled.put(text, expr)
+        return expr
+
+
+    def _render(self, gene):
+        '''
+        @return: (steps, dict register -> instruction, variables) of the
+                 program of the gene, rendered once for the genes of the
+                 same key
+        '''
+        key = gene.key
+        rendered = self.rendered.get(key)
+        if rendered is None:
+            program = gene.program
+            rendered = (render(program), 
+                        dict((inst[0], inst) for inst in program.instructions),
+                        program.variables)
+            self.rendered.put(key, rendered)
+        return rendered
+
+
+    def _run(self, gene, df):
+        '''
+        @param gene: PyMOGEP.gene
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset
+        @return: float array, result of the program of the gene, or None 
+                 if the program is left to numpy
+        '''
+        steps, instructions, variables = self._render(gene)
+        if not steps:
+            return None
+        values = {}
+        columns = columnArrays(df, variables)
+
+        def argument(reg):
+            if reg in values:
+                return values[reg]
+            _, kind, value, _ = instructions[reg]
+            return columns[value] if kind == VARIABLE else value
+
+        for reg, kind, value, args in steps:
+            if kind == FUNCTION:
+                values[reg] = value(*[argument(arg) for arg in args])
+                continue
+
+            arrays = []
+            for inputKind, inputValue in args:
+                if inputKind == VARIABLE:
+                    arrays.append(columns[inputValue])
+                elif inputKind == FUNCTION:
+                    arrays.append(np.asarray(values[inputValue]))
+                else:
+                    arrays.append(np.asarray(inputValue))
+            if (any(arr.dtype != np.float64 for arr in arrays) or
+                all(arr.ndim == 0 for arr in arrays)):
+                return None
+            values[reg] = self._compile(value, len(arrays))(*arrays)
+        return values[0]
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, training set
+        '''
+        for chro in chromosomes:
+            if isEvaluated(chro):
+                continue
+            genes = _distinctGenes([chro, ])
+            if df is not None:
+                for gene in genes:
+                    try:
+                        result = self._run(gene, df)
+                    except Exception:
+                        result = None
+                    if result is not None:
+                        gene.setResult(df, result)
+            _evalFitnesses(chro, df)
+            for gene in genes:
+                gene.setResult(None, None)
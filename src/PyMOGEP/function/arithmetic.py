@@ -5,19 +5,23 @@
 @license: GPLv2
 '''
 
-from PyMOGEP.decorator import symbol
+from PyMOGEP.decorator import (symbol, ufunc)
+import numpy as np
 
 __all__ = ['op_add', 'op_substract', 'op_multiply', 'op_divide', 'op_modulus']
 
 @symbol('+')
+@ufunc(np.add)
 def op_add(x, y):
     return x + y
 
 @symbol('-')
+@ufunc(np.subtract)
 def op_substract(x, y):
     return x - y
 
 @symbol('*')
+@ufunc(np.multiply)
 def op_multiply(x, y):
     return x * y
 
@@ -26,6 +30,7 @@ def op_divide(x, y):
     return float(x) / y
 
 @symbol('%')
+@ufunc(np.remainder)
 def op_modulus(x, y):
     return x % y
  
\ No newline at end of file
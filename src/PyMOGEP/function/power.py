@@ -5,25 +5,29 @@
 @license: GPLv2
 '''
 
-from PyMOGEP.decorator import symbol
+from PyMOGEP.decorator import (symbol, ufunc)
 import numpy as np
 
 __all__ = ['op_ln', 'op_log10', 'op_power', 'op_exp', 'op_power10', 'op_square',
            'op_cube', 'op_root', 'op_cube_root', 'op_inverse']
 
 @symbol('LN')
+@ufunc(np.log)
 def op_ln(x):
     return np.log(x)
 
 @symbol('LOG10')
+@ufunc(np.log10)
 def op_log10(x):
     return np.log10(x)
 
 @symbol('^')
+@ufunc(np.power)
 def op_power(x, y):
     return x**y
 
 @symbol('E^')
+@ufunc(np.exp)
 def op_exp(x):
     return np.exp(x)
 
@@ -32,6 +36,7 @@ def op_power10(x):
     return 10 ** x
 
 @symbol('^2')
+@ufunc(np.square)
 def op_square(x):
     return x*x
 
@@ -40,6 +45,7 @@ def op_cube(x):
     return x*x*x
 
 @symbol('Q')
+@ufunc(np.sqrt)
 def op_root(x):
     return np.sqrt(x)
 
@@ -48,6 +54,7 @@ def op_cube_root(x):
     return x ** (1./3)
 
 @symbol('^-1')
+@ufunc(np.reciprocal)
 def op_inverse(x):
     return 1./x
 
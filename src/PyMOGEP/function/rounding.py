@@ -5,24 +5,28 @@
 @license: GPLv2
 '''
 
-from PyMOGEP.decorator import symbol
+from PyMOGEP.decorator import (symbol, ufunc)
 import numpy as np
 
 __all__ = ['op_floor', 'op_ceil', 'op_round', 'op_abs']
 
 @symbol('FLOOR')
+@ufunc(np.floor)
 def op_floor(x):
     return np.floor(x)
 
 @symbol('CEIL')
+@ufunc(np.ceil)
 def op_ceil(x):
     return np.ceil(x)
 
 @symbol('ROUND')
+@ufunc(np.rint)
 def op_round(x):
     return np.round(x)
 
 @symbol('ABS')
+@ufunc(np.absolute)
 def op_abs(x):
     return abs(x)
 
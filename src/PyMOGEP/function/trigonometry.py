@@ -5,7 +5,7 @@
 @license: GPLv2
 '''
 
-from PyMOGEP.decorator import symbol
+from PyMOGEP.decorator import (symbol, ufunc)
 import numpy as np
 
 _all__ = ['op_sin', 'op_cos', 'op_tan', 'op_csc', 'op_sec', 'op_cot',
@@ -14,14 +14,17 @@ _all__ = ['op_sin', 'op_cos', 'op_tan', 'op_csc', 'op_sec', 'op_cot',
 
 
 @symbol('SIN')
+@ufunc(np.sin)
 def op_sin(x):
     return np.sin(x)
 
 @symbol('COS')
+@ufunc(np.cos)
 def op_cos(x):
     return np.cos(x)
 
 @symbol('TAN')
+@ufunc(np.tan)
 def op_tan(x):
     return np.tan(x)
 
@@ -38,14 +41,17 @@ def op_cot(x):
     return 1./np.tan(x)
 
 @symbol('ASIN')
+@ufunc(np.arcsin)
 def op_arcsin(x):
     return np.arcsin(x)
 
 @symbol('ACOS')
+@ufunc(np.arccos)
 def op_arccos(x):
     return np.arccos(x)
 
 @symbol('ATAN')
+@ufunc(np.arctan)
 def op_arctan(x):
     return np.arctan(x)
 
@@ -62,14 +68,17 @@ def op_arccot(x):
     return 1./np.arctan(x)
 
 @symbol('SINH')
+@ufunc(np.sinh)
 def op_sinh(x):
     return np.sinh(x)
 
 @symbol('COSH')
+@ufunc(np.cosh)
 def op_cosh(x):
     return np.cosh(x)
 
 @symbol('TANH')
+@ufunc(np.tanh)
 def op_tanh(x):
     return np.tanh(x)
 
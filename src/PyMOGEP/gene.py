@@ -14,12 +14,20 @@ Conference(GECCO-2005), Washington, D.C., 2005.
 '''
 import copy
 import numpy as np
-from PyMOGEP.decorator import cache
+from PyMOGEP.decorator import (cache, cacheName)
+from PyMOGEP.program import Program
 
 class Gene(object):
     '''GEP gene class, a chromosome can contain many genes, and they 
     are linked by the linker function
     '''
+    __slots__ = ('alleles', 'headLength', 'tailLength', 'RNCGenerator', 'Dc',
+                 'evalLength', 'evalRepr', 'evalResultArr', '_evalResultDf',
+                 '_repr_cache', '_program_cache', '_key_cache')
+
+    # PyMOGEP.memory.SubtreeCache of the evaluating population, or None
+    # (SubtreeCache.sharedBy)
+    subtreeCache = None
 
     def __init__(self, alleles, headLength, RNCGenerator=None):
         '''
@@ -28,7 +36,6 @@ class Gene(object):
         @param RNCGenerator, random number generator for RNC algorithm
         
         @ivar evalLength: integer, number of alleles used after evaluating the gene
-        @ivar _evalAlleles: list,  partial elements of the alleles
         @ivar evalRepr: representation of the evaluting alleles, not whole alleles   
         '''
         self.alleles = alleles
@@ -39,12 +46,12 @@ class Gene(object):
             self.Dc = [RNCGenerator() for _ in xrange(self.tailLength)] 
         
         self.evalLength = 0
-        self._evalAlleles = None
         self._evalLength()
         self._legalForm()
         
         self.evalRepr = None
         self.evalResultArr = None
+        self._evalResultDf = None
     
     def _legalForm(self):
         '''check if the head of gene is legal'''
@@ -63,22 +70,67 @@ class Gene(object):
         the gene is parsed level order way, 
         computing number of required alleles for parsing the gene
         '''
+        alleles = self.alleles
         endIdx = 0
         for idx in xrange(self.headLength):
-            if callable(self.alleles[idx]):
-                endIdx += self.alleles[idx].func_code.co_argcount
+            if callable(alleles[idx]):
+                endIdx += alleles[idx].func_code.co_argcount
             if idx == endIdx:
                 break
         
         self.evalLength = endIdx + 1
-        self._evalAlleles = self.alleles[:self.evalLength]
         
 
+    def _children(self):
+        '''
+        the gene is parsed in level order (Karva notation), the arguments
+        of each function are the next unused alleles.
+        @return: list of tuple, indices of the arguments of each
+                 evaluated allele
+        '''
+        children = []
+        argIdx = 1
+        for allele in self.alleles[:self.evalLength]:
+            arity = allele.func_code.co_argcount if callable(allele) else 0
+            children.append(tuple(xrange(argIdx, argIdx + arity)))
+            argIdx += arity
+        return children
+
+    @cache
+    def _program(self):
+        '''
+        compiling the evaluated region of the gene, the program is cached
+        on the gene and it is kept by the copies made in modify() which
+        do not change the evaluated region.
+        '''
+        constants = {}
+        for idx, allele in enumerate(self.alleles[:self.evalLength]):
+            if allele == '?':
+                constants[idx] = self.Dc[idx - self.headLength - 1]
+        return Program(self.alleles[:self.evalLength], self._children(),
+                       constants)
+
+    program = property(lambda self: self._program(), 
+                       doc='compiled program of the evaluated region')
+
+    @cache
+    def _key(self):
+        '''
+        canonical key of the evaluated region, the RNC symbols are
+        replaced by their constants.
+        '''
+        alleles = list(self.alleles[:self.evalLength])
+        for idx, allele in enumerate(alleles):
+            if allele == '?':
+                alleles[idx] = ('?', self.Dc[idx - self.headLength - 1])
+        return (type(self), tuple(alleles))
+
+    key = property(lambda self: self._key(),
+                   doc='hashable structure of the evaluated region')
+
     def eval(self, df):
         '''
         Evaluates the gene against gene from argument.
-        if the gene is evaluated once, the result will memory in its 
-        attribute.
         we memory the evaluted the results in its attributes.
         alleles: [+, x, +, y, x ]
         => 
@@ -89,37 +141,34 @@ class Gene(object):
         @param df, pandas.DataFrame, user specified data set
         @return, numpy.array, results of evaluating the gene.
         '''
-        if self.evalLength == 0:
-            self._evalLength()
-        else:
-            jdx = self.evalLength
-            self._evalAlleles = self.alleles[:self.evalLength]
-            
-        for idx in reversed(xrange(jdx)):
-            
-            allele = self._evalAlleles[idx]
-            #replace variable to corresponding array
-            if isinstance(allele, str):
-                if allele != '?':
-                    self._evalAlleles[idx] = df[allele]
-                else:
-                    self._evalAlleles[idx] = self.Dc[idx - self.headLength - 1]
-            
-            #allele is a value
-            if isinstance(allele, float) or isinstance(allele, int):
-                self._evalAlleles[idx] = np.repeat(float(allele), df.index.size) 
-            
-            # if allele is a function
-            if callable(allele):
-                arity = allele.func_code.co_argcount
-                args = self._evalAlleles[jdx - arity: jdx]
-            
-                # Replace the operation in eval with its return array
-                self._evalAlleles[idx] = allele(*args)
-                jdx -= arity
-
-        self.evalResultArr = self._evalAlleles[0] 
+        if df is not self._evalResultDf or df is None:
+            self.evalResultArr = self.program.run(df, self.subtreeCache)
+            self._evalResultDf = None
         return self.evalResultArr
+
+    def evalRoot(self, df):
+        '''
+        evaluates the gene but its root function, which is applied by the
+        reducers of the objectives block by block (PyMOGEP.objective).
+        @param df, pandas.DataFrame, user specified data set
+        @return, PyMOGEP.program.RootCall, or the result of eval(df) if
+                 the result is known or the root has no ufunc
+        '''
+        if df is self._evalResultDf and df is not None:
+            return self.evalResultArr
+        return self.program.runRoot(df, self.subtreeCache)
+
+    def setResult(self, df, resultArr):
+        '''
+        stores the result of the gene computed outside of the gene 
+        (e.g. by the batch evaluator), the following eval(df) returns 
+        resultArr directly.
+        @param df, pandas.DataFrame, data set of the result, or None 
+                   to release the result
+        @param resultArr, numpy.array, result of evaluating the gene
+        '''
+        self._evalResultDf = df
+        self.evalResultArr = resultArr
     
                  
     def modify(self, changes):
@@ -162,7 +211,7 @@ class Gene(object):
             #update representation of the gene
             gene.evalRepr = None
             try:
-                delattr(gene, "___repr___cache")
+                delattr(gene, cacheName('__repr__'))
             except AttributeError:
                 pass
     
@@ -224,58 +273,98 @@ class PrefixGene(Gene):
     have the same number of internal (function) node except 
     these functions are in different locations in the trees.
     '''
+    __slots__ = ()
     
     def __init__(self, alleles, headLength, RNCGenerator=None ):
         super(PrefixGene, self).__init__(alleles, headLength, RNCGenerator)
     
     
-    def eval(self, df):
-        '''prefix order to parse the chromsome'''
-        self._evalLength()
-        
-        evalStack = []
-        arity, argCount = [], 0
-        for idx, allele in enumerate(self._evalAlleles):
-            
-            if callable(allele):
-                #allele is a function
-                arity.append(allele.func_code.co_argcount)
-                argCount = 0
-                evalStack.append(allele)
-            
-            elif isinstance(allele, str):
-                #allele is a variable 
-                if allele != '?':
-                    allele = df[allele]
-                else:
-                    allele = self.Dc[idx - self.headLength - 1]
-                argCount += 1
-                evalStack.append(allele)
-        
-            elif isinstance(allele, int) or isinstance(allele, float):
-                #allele is a value
-                allele = np.repeat(float(allele), df.index.size)
-                argCount += 1
-                evalStack.append(allele)
-        
-            #stack traceback
-            while len(arity) and argCount == arity[-1]:
-                operands = [evalStack.pop() for _ in xrange(arity[-1])][::-1]
-                operator = evalStack.pop()
-                evalStack.append(operator(*operands))
-
-                argCount = argCount - arity[-1] + 1
-                for op in reversed(evalStack[:-1]):
-                    if not callable(op):
-                        argCount += 1
-                    else:
-                        break
-
-                arity.pop()
-                
-            if not arity:
-                assert len(evalStack) == 1
-                return evalStack[0]   
+    def _children(self):
+        '''
+        the gene is parsed in prefix order, the arguments of each function
+        are the subtrees following it.
+        @return: list of tuple, indices of the arguments of each
+                 evaluated allele
+        '''
+        children = [() for _ in xrange(self.evalLength)]
+        parents = []  # [idx, number of missing arguments]
+        for idx, allele in enumerate(self.alleles[:self.evalLength]):
+            if parents:
+                children[parents[-1][0]] += (idx,)
+                parents[-1][1] -= 1
+                if parents[-1][1] == 0:
+                    parents.pop()
+
+            arity = allele.func_code.co_argcount if callable(allele) else 0
+            if arity:
+                parents.append([idx, arity])
+        return children
+
+
+class CompactGene(Gene):
+    '''
+    gene storing its alleles as a small integer array (codes) of indices
+    into the alphabet of the chromosome class, the functions and terminals
+    are decoded on access. The gene type must be bound to an alphabet by
+    CompactGene.bind(), which is done by MetaChromosome.
+    '''
+    __slots__ = ('codes',)
+    alphabet = None        # tuple of symbols, set by bind()
+    codeType = np.int8     # dtype of the codes, set by bind()
+    _alphabetIndex = None  # dict, symbol -> code, set by bind()
+
+    @classmethod
+    def bind(cls, alphabet):
+        '''
+        @param alphabet: tuple of symbols indexed by the codes
+        @return: subclass of cls encoding the alleles by alphabet
+        '''
+        alphabet = tuple(alphabet)
+        index = dict((sym, idx) for idx, sym in 
+                     reversed(list(enumerate(alphabet))))
+        codeType = np.int8 if len(alphabet) <= 128 else np.int16
+        return type(cls.__name__, (cls,), {
+                '__slots__': (), '__module__': cls.__module__,
+                'alphabet': alphabet, 'codeType': codeType,
+                '_alphabetIndex': index})
+
+    def __init__(self, alleles, headLength, RNCGenerator=None):
+        if self.alphabet is None:
+            raise TypeError('%s is not bound to an alphabet'%(
+                                type(self).__name__))
+        super(CompactGene, self).__init__(alleles, headLength, RNCGenerator)
+        if RNCGenerator:
+            self.Dc = np.asarray(self.Dc, dtype=np.float64)
+
+    def _getAlleles(self):
+        '''@return: list, decoded alleles'''
+        alphabet = self.alphabet
+        return [alphabet[code] for code in self.codes.tolist()]
+
+    def _setAlleles(self, alleles):
+        '''@param alleles: list, symbol of function and terminal'''
+        index = self._alphabetIndex
+        self.codes = np.array([index[allele] for allele in alleles], 
+                              dtype=self.codeType)
+
+    alleles = property(_getAlleles, _setAlleles, 
+                       doc='alleles decoded from the codes')
+
+    def __len__(self):
+        '''@return: number of alleles in the gene'''
+        return len(self.codes)
+
+    def __getitem__(self, idx):
+        '''@return: an individual allele or a list of alleles'''
+        if isinstance(idx, slice):
+            alphabet = self.alphabet
+            return [alphabet[code] for code in self.codes[idx].tolist()]
+        return self.alphabet[self.codes[idx]]
+
+
+class CompactPrefixGene(CompactGene, PrefixGene):
+    '''prefix gene storing its alleles as codes'''
+    __slots__ = ()
 
 
 def testGene():
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+island model: each island is a Population evolving in its own worker
+process, and every migrationInterval generations an island sends the
+elites of its best front to its neighbors of the topology, and the
+migrants arrived in the mean time replace its worst chromosomes.
+
+the migration is asynchronous, an island never waits for the others,
+the arrived messages are read without blocking at the migration points,
+thus the migrants depend on the timing of the islands. If a seed is
+given, the migration is synchronous instead: an island waits for the
+migrants of the same generation from all its sources, and the arrived
+migrants are ordered by the sources, thus the run is reproducible.
+The migrants are sent with their compact encodings (Chromosome.encode)
+and fitnesses over a transport:
+    - QueueTransport: multiprocessing queues of the local processes.
+    - SocketTransport: TCP connections, the islands listen on localhost
+      by default, or on the user specified (host, port) addresses, then
+      the islands can be run on many nodes, IslandModel.solve(n, islands)
+      runs a part of the islands on each node.
+
+E. Cantu-Paz, "A Survey of Parallel Genetic Algorithms," Calculateurs
+Paralleles, Reseaux et Systems Repartis, vol. 10, pp. 141-171, 1998.
+'''
+import multiprocessing as mp
+import Queue
+import cPickle as pickle
+import random
+import select
+import socket
+import struct
+import traceback
+from time import (time, sleep)
+import numpy as np
+from PyMOGEP.decorator import cacheName
+from PyMOGEP.evolution.linker import defaultLinker
+from PyMOGEP.population import Population
+from PyMOGEP.sort import MatrixSort
+
+__all__ = ['ringTopology', 'fullTopology', 'QueueTransport',
+           'SocketTransport', 'IslandModel']
+
+
+def ringTopology(idx, n_islands):
+    '''@return: list of the destinations of island idx, the next island'''
+    return [(idx + 1) % n_islands] if n_islands > 1 else []
+
+
+def fullTopology(idx, n_islands):
+    '''@return: list of the destinations of island idx, all other islands'''
+    return [dest for dest in xrange(n_islands) if dest != idx]
+
+
+class QueueTransport(object):
+    '''an inbox queue of each island, for the islands of one host'''
+
+    def endpoints(self, n_islands):
+        '''@return: list of the endpoint of each island'''
+        queues = [mp.Queue() for _ in xrange(n_islands)]
+        return [QueueEndpoint(idx, queues) for idx in xrange(n_islands)]
+
+
+class QueueEndpoint(object):
+    '''endpoint of an island of QueueTransport'''
+
+    def __init__(self, idx, queues):
+        self.idx = idx
+        self.queues = queues
+
+
+    def open(self):
+        pass
+
+
+    def detach(self):
+        '''the queues are shared by all islands'''
+        pass
+
+
+    def send(self, dest, message):
+        '''
+        puts the message into the inbox of island dest
+        @return: True
+        '''
+        self.queues[dest].put(message)
+        return True
+
+
+    def receive(self, timeout=0):
+        '''
+        @param timeout: float, seconds waiting for the first message
+        @return: list of the arrived messages
+        '''
+        messages = []
+        try:
+            if timeout > 0:
+                messages.append(self.queues[self.idx].get(timeout=timeout))
+            while True:
+                messages.append(self.queues[self.idx].get_nowait())
+        except Queue.Empty:
+            return messages
+
+
+    def close(self):
+        '''the messages not read by the finished islands are discarded'''
+        for queue in self.queues:
+            queue.cancel_join_thread()
+
+
+class SocketTransport(object):
+    '''
+    each island listens on a TCP address, and a message is sent by a
+    connection to the address of the destination.
+    '''
+
+    def __init__(self, addresses=None, host='127.0.0.1', timeout=5.):
+        '''
+        @param addresses: list of (host, port) of each island, or None,
+                          the islands listen on free ports of host, which
+                          requires the islands run on the forked processes
+                          of this host
+        @param host: string, host of the free ports
+        @param timeout: float, seconds of connecting and receiving a message
+        
+        the listeners on the free ports are created in this process and
+        inherited by the forked islands, each island closes the listeners
+        of the other islands (SocketEndpoint.detach).
+        '''
+        self.addresses = addresses
+        self.host = host
+        self.timeout = timeout
+
+
+    def endpoints(self, n_islands):
+        '''@return: list of the endpoint of each island'''
+        if self.addresses is not None:
+            assert len(self.addresses) == n_islands
+            return [SocketEndpoint(idx, self.addresses, None, self.timeout)
+                    for idx in xrange(n_islands)]
+
+        listeners = [_listen((self.host, 0), n_islands)
+                     for _ in xrange(n_islands)]
+        addresses = [listener.getsockname() for listener in listeners]
+        return [SocketEndpoint(idx, addresses, listener, self.timeout)
+                for idx, listener in enumerate(listeners)]
+
+
+def _listen(address, backlog):
+    '''@return: socket listening on the address'''
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(address)
+    listener.listen(max(backlog, 16))
+    return listener
+
+
+def _recvAll(conn, size):
+    '''@return: string, size bytes read from the connection'''
+    chunks = []
+    while size:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise socket.error('connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+class SocketEndpoint(object):
+    '''endpoint of an island of SocketTransport'''
+
+    def __init__(self, idx, addresses, listener, timeout):
+        self.idx = idx
+        self.addresses = addresses
+        self.listener = listener
+        self.timeout = timeout
+
+
+    def open(self):
+        '''listens on the address of the island'''
+        if self.listener is None:
+            self.listener = _listen(tuple(self.addresses[self.idx]),
+                                    len(self.addresses))
+
+
+    def detach(self):
+        '''
+        closes the listener inherited by the process of another island,
+        then the connections to this island are refused as soon as it
+        closes its own listener.
+        '''
+        self.close()
+
+
+    def send(self, dest, message):
+        '''
+        sends the message to island dest. The connection is refused at once
+        if island dest is not listening (e.g. it has finished), and it
+        waits up to the timeout if the address can not be reached.
+        @return: boolean, False if the message is dropped
+        '''
+        data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        try:
+            conn = socket.create_connection(tuple(self.addresses[dest]),
+                                            self.timeout)
+            try:
+                conn.sendall(struct.pack('!Q', len(data)) + data)
+            finally:
+                conn.close()
+        except socket.error:
+            return False
+        return True
+
+
+    def receive(self, timeout=0):
+        '''
+        @param timeout: float, seconds waiting for the first message
+        @return: list of the arrived messages
+        '''
+        messages = []
+        while select.select([self.listener], [], [], 
+                            0 if messages else timeout)[0]:
+            conn, _ = self.listener.accept()
+            conn.settimeout(self.timeout)
+            try:
+                size, = struct.unpack('!Q', _recvAll(conn, 8))
+                messages.append(pickle.loads(_recvAll(conn, size)))
+            except socket.error:
+                pass
+            finally:
+                conn.close()
+        return messages
+
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+
+def _exchange(model, idx, gen, migrants, endpoint, destinations, inbox):
+    '''
+    synchronous migration of a seeded run, island idx sends its migrants
+    of generation gen and waits for the migrants of gen from its sources.
+    @param migrants: list of (encoding, fitnesses) sent to the destinations
+    @param inbox: dict, generation -> {source: migrants}, the migrants of
+                  the later generations are kept until their migration
+    @return: list of the arrived messages, ordered by the sources
+    '''
+    sources = [src for src in xrange(model.n_islands) if src != idx and
+               idx in (model.topology(src, model.n_islands)
+                       if callable(model.topology) else model.topology[src])]
+    deadline = time() + model.timeout
+    for dest in destinations:
+        # the listener of dest may not be opened yet
+        while not endpoint.send(dest, (idx, gen, migrants)):
+            if time() > deadline:
+                raise RuntimeError('island %s can not send to island %s'%(
+                                   idx, dest))
+            sleep(0.1)
+
+    arrived = inbox.setdefault(gen, {})
+    while len(arrived) < len(sources):
+        remaining = deadline - time()
+        messages = endpoint.receive(remaining) if remaining > 0 else []
+        if not messages:
+            raise RuntimeError('island %s: migrants of generation %s from '
+                               'islands %s did not arrive'%(idx, gen, 
+                               sorted(set(sources) - set(arrived))))
+        for src, msgGen, msgMigrants in messages:
+            inbox.setdefault(msgGen, {})[src] = msgMigrants
+    inbox.pop(gen)
+    return [(src, gen, arrived[src]) for src in sorted(arrived)]
+
+
+def _runIsland(model, idx, n_generation, endpoints, results):
+    '''
+    evolves island idx in the worker process, and puts
+    (idx, list of (encoding, fitnesses) of the population, statistics)
+    or (idx, None, traceback) into the results queue.
+    '''
+    endpoint = endpoints[idx]
+    try:
+        for other in endpoints:
+            if other is not endpoint:
+                other.detach()
+        endpoint.open()
+        kwargs = dict(model.populationKwargs)
+        if model.seed is not None:
+            random.seed(model.seed + idx)
+            np.random.seed(model.seed + idx)
+            # independent stream of the genetic operators of each island
+            kwargs.setdefault('rng', np.random.RandomState([model.seed, idx]))
+        if model.df is not None:
+            Population.train_df = model.df
+
+        pop = Population(model.chro, model.popSize, model.headLength,
+                         model.n_genes, **kwargs)
+        destinations = (model.topology(idx, model.n_islands)
+                        if callable(model.topology) else model.topology[idx])
+        stats = {'sent': 0, 'received': 0}
+        name = cacheName('_fitnesses')
+        inbox = {}
+
+        for gen in xrange(1, n_generation + 1):
+            pop.evolve()
+            if gen % model.migrationInterval or gen == n_generation:
+                continue
+
+            migrants = [(chro.encode(), chro.fitnesses)
+                        for chro in pop.emigrants(model.n_migrants)]
+            if model.seed is not None:
+                received = _exchange(model, idx, gen, migrants, endpoint,
+                                     destinations, inbox)
+            else:
+                for dest in destinations:
+                    endpoint.send(dest, (idx, gen, migrants))
+                received = endpoint.receive()
+            stats['sent'] += len(migrants) * len(destinations)
+
+            arrived = []
+            for _, _, messages in received:
+                for encoding, fitnesses in messages:
+                    chro = model.chro.decode(encoding, pop.headLength,
+                                             pop.linker, pop.RNCGenerator)
+                    setattr(chro, name, fitnesses)
+                    arrived.append(chro)
+            pop.immigrate(arrived)
+            stats['received'] += len(arrived)
+            if model.verbose:
+                print "Island[%s] Generation[%s], sent: %s, received: %s"%(
+                        idx, gen, stats['sent'], stats['received'])
+
+        endpoint.close()
+        results.put((idx, [(chro.encode(), chro.fitnesses)
+                           for chro in pop.population], stats))
+    except Exception:
+        endpoint.close()
+        results.put((idx, None, traceback.format_exc()))
+
+
+class IslandModel(object):
+    '''islands of the populations evolved in the worker processes'''
+
+    def __init__(self, chro, n_islands, popSize, headLength, n_genes=1,
+                 migrationInterval=5, n_migrants=2, topology=ringTopology,
+                 transport=None, df=None, seed=None, timeout=60.,
+                 verbose=False, **populationKwargs):
+        '''
+        @param chro, PyMOGEP.chromosome, user defined chromsome
+        @param n_islands: positive integer, number of islands
+        @param popSize, headLength, n_genes: parameters of the population
+                        of each island
+        @param migrationInterval: positive integer, generations between
+                                  the migrations
+        @param n_migrants: positive integer, maximum number of the elites
+                           sent to each neighbor
+        @param topology: function(idx, n_islands) or list, destinations
+                         of each island
+        @param transport: QueueTransport or SocketTransport, default is
+                          QueueTransport
+        @param df: training set of the islands, default is
+                   Population.train_df when solving
+        @param seed: integer or None, island idx is seeded by seed + idx,
+                     and its genetic operators draw from the generator
+                     seeded by [seed, idx]. The migration of a seeded run
+                     is synchronous, thus the results are reproducible.
+        @param timeout: float, seconds an island of a seeded run waits
+                        for the migrants of its sources
+        @param populationKwargs: the other parameters of the populations,
+                                 e.g. n_elites, RNCGenerator, evaluator
+        '''
+        assert n_islands > 0 and migrationInterval > 0 and n_migrants > 0
+        self.chro = chro
+        self.n_islands = n_islands
+        self.popSize = popSize
+        self.headLength = headLength
+        self.n_genes = n_genes
+        self.migrationInterval = migrationInterval
+        self.n_migrants = n_migrants
+        self.topology = topology
+        self.transport = transport if transport else QueueTransport()
+        self.df = df
+        self.seed = seed
+        self.timeout = timeout
+        self.verbose = verbose
+        self.populationKwargs = populationKwargs
+
+        self.islands = []    # final population of each island
+        self.stats = []      # migration statistics of each island
+        self.bestFront = []  # non-dominated chromosomes of all islands
+
+
+    def solve(self, n_generation, islands=None):
+        '''
+        evolves the islands n_generation generations in the worker
+        processes, the final populations are kept in self.islands.
+        @param n_generation: positive integer
+        @param islands: list of the indices of the islands run on this
+                        host, default is all islands
+        '''
+        if self.df is None:
+            self.df = Population.train_df
+        islands = range(self.n_islands) if islands is None else list(islands)
+        endpoints = self.transport.endpoints(self.n_islands)
+        results = mp.Queue()
+        processes = [mp.Process(target=_runIsland,
+                                args=(self, idx, n_generation,
+                                      endpoints, results))
+                     for idx in islands]
+        for process in processes:
+            process.start()
+        # the endpoints are owned by the worker processes
+        for endpoint in endpoints:
+            endpoint.close()
+
+        finished = sorted(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        failed = [(idx, info) for idx, encodings, info in finished
+                  if encodings is None]
+        if failed:
+            raise RuntimeError('island %s failed:\n%s'%failed[0])
+
+        name = cacheName('_fitnesses')
+        linker = self.populationKwargs.get('linker', defaultLinker)
+        RNCGenerator = self.populationKwargs.get('RNCGenerator')
+        self.islands, self.stats = [], []
+        for idx, encodings, stats in finished:
+            population = []
+            for encoding, fitnesses in encodings:
+                chro = self.chro.decode(encoding, self.headLength, linker,
+                                        RNCGenerator)
+                setattr(chro, name, fitnesses)
+                population.append(chro)
+            self.islands.append(population)
+            self.stats.append(stats)
+
+        allChros = [chro for population in self.islands for chro in population]
+        ranks = MatrixSort.nonDominatedRanks(
+                            MatrixSort.fitnessMatrix(allChros))
+        self.bestFront = [chro for chro, rank in zip(allChros, ranks)
+                          if rank == 1]
+        return self.bestFront
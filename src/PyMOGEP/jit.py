@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+numba backend of the gene evaluation (numba is optional,
+http://numba.pydata.org).
+
+two kernels are provided:
+    - fused: the genes of a chromosome are compiled to one loop over the
+      rows, each row is read once and the values of the nodes stay in
+      registers. The kernels are cached by their source code, which
+      depends on the structure of the genes only (the constants and the
+      columns are arguments), thus identical trees are not compiled again.
+    - stack: one precompiled kernel interprets the postfix opcode arrays
+      of all genes of the population by blocks of rows, no compilation
+      per chromosome is required.
+
+the functions are identified by their symbols as in PyMOGEP.expression,
+the genes with other functions are left to Gene.eval() (numpy). The
+default linker only groups the results of the genes, the other linkers
+are applied by Chromosome.eval() to the fused results.
+'''
+import numpy as np
+from PyMOGEP.evaluator import (Evaluator, isEvaluated, _distinctGenes,
+                                _evalFitnesses)
+from PyMOGEP.expression import TEMPLATES
+from PyMOGEP.memory import LRUCache
+from PyMOGEP.program import (FUNCTION, VARIABLE)
+
+try:
+    import numba
+    prange = numba.prange
+except ImportError:
+    numba = None
+    prange = xrange
+
+__all__ = ['OPCODES', 'encode', 'fusedSource', 'JitEvaluator']
+
+# opcodes of the stack kernel, pushing a column, pushing a constant, and
+# the functions of TEMPLATES
+VAR, CONST = 0, 1
+OPCODES = dict((sym, code) for code, sym in enumerate(
+                    ('+', '-', '*', '^', '^2', '^3', '^-1', '10^', 'Q', 'Q3',
+                     'LN', 'LOG10', 'E^', 'ABS', 'SIN', 'COS', 'TAN', 'CSC',
+                     'SEC', 'COT', 'ASIN', 'ACOS', 'ATAN', 'ACSC', 'ASEC',
+                     'ACOT', 'SINH', 'COSH', 'TANH'), 2))
+
+# numpy functions of the names in the templates, for the fused kernels
+_NAMESPACE = {'sqrt': np.sqrt, 'log': np.log, 'log10': np.log10,
+              'exp': np.exp, 'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+              'arcsin': np.arcsin, 'arccos': np.arccos, 'arctan': np.arctan,
+              'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh}
+
+# rows of a block of the stack kernel
+BLOCK_SIZE = 256
+
+
+def _postfix(program):
+    '''
+    @return: list of the instructions of the program in postfix order,
+             or None if a function is not in TEMPLATES or the root is not
+             a function of arguments
+    '''
+    instructions = dict((inst[0], inst) for inst in program.instructions)
+    root = instructions[0]
+    if root[1] != FUNCTION or not root[3]:
+        return None
+
+    order, stack = [], [(0, False)]
+    while stack:
+        reg, visited = stack.pop()
+        inst = instructions[reg]
+        if visited or inst[1] != FUNCTION:
+            order.append(inst)
+            continue
+        n, _ = TEMPLATES.get(getattr(inst[2], 'symbol', None), (None, None))
+        if n != len(inst[3]):
+            return None
+        stack.append((reg, True))
+        stack.extend((arg, False) for arg in reversed(inst[3]))
+    return order
+
+
+def encode(program, columnIndex):
+    '''
+    @param program: PyMOGEP.program.Program
+    @param columnIndex: dict, column name -> index of the column in the
+                        column array of the kernel
+    @return: integer array, opcodes in postfix order
+             integer array, operands (column index or constant index)
+             float array, constants
+             integer, maximum depth of the stack
+             or None if the program can not be encoded
+    '''
+    order = _postfix(program)
+    if order is None:
+        return None
+
+    codes, operands, constants = [], [], []
+    depth = maxDepth = 0
+    for reg, kind, value, args in order:
+        if kind == FUNCTION:
+            codes.append(OPCODES[value.symbol])
+            operands.append(0)
+            depth -= len(args) - 1
+        elif kind == VARIABLE:
+            codes.append(VAR)
+            operands.append(columnIndex[value])
+            depth += 1
+        else:
+            codes.append(CONST)
+            operands.append(len(constants))
+            constants.append(value)
+            depth += 1
+        maxDepth = max(maxDepth, depth)
+    return (np.array(codes, dtype=np.int64),
+            np.array(operands, dtype=np.int64),
+            np.array(constants, dtype=np.float64), maxDepth)
+
+
+def fusedSource(programs):
+    '''
+    @param programs: list of PyMOGEP.program.Program, which can be encoded
+    @return: string, source code of kernel(x, v, c, out), computing
+             out[k, i] = programs[k] at row i, where x[v[j], i] is the
+             j-th variable, and c the constants in order of appearance
+             list, names of the variables
+             list, the constants
+    '''
+    lines, variables, constants = [], [], []
+    for idx, program in enumerate(programs):
+        temps = []
+        for reg, kind, value, args in _postfix(program):
+            if kind == FUNCTION:
+                _, template = TEMPLATES[value.symbol]
+                argTemps = temps[len(temps) - len(args):]
+                del temps[len(temps) - len(args):]
+                expression = template.format(*argTemps)
+            elif kind == VARIABLE:
+                if value not in variables:
+                    variables.append(value)
+                expression = 'x[v[%d], i]'%variables.index(value)
+            else:
+                expression = 'c[%d]'%len(constants)
+                constants.append(value)
+            temp = 't%d'%len(lines)
+            lines.append('%s = %s'%(temp, expression))
+            temps.append(temp)
+        lines.append('out[%d, i] = %s'%(idx, temps.pop()))
+
+    source = ('def kernel(x, v, c, out):\n'
+              '    for i in prange(out.shape[1]):\n%s\n'%(
+                    '\n'.join('        %s'%line for line in lines)))
+    return source, variables, constants
+
+
+def _stackKernel(codes, operands, starts, depths, constants, columns, out):
+    '''
+    @param codes, operands: integer arrays, opcodes of all programs
+    @param starts: integer array, the opcodes of program p are
+                   codes[starts[p]: starts[p+1]]
+    @param depths: integer array, maximum stack depth of each program
+    @param constants: float array, operands of CONST
+    @param columns: float array (n_columns, n_rows), operands of VAR
+    @param out: float array (n_programs, n_rows), results of the programs
+    '''
+    n_rows = out.shape[1]
+    for p in prange(len(starts) - 1):
+        stack = np.empty((depths[p], BLOCK_SIZE))
+        for start in range(0, n_rows, BLOCK_SIZE):
+            m = min(BLOCK_SIZE, n_rows - start)
+            sp = 0
+            for k in range(starts[p], starts[p + 1]):
+                op = codes[k]
+                if op == VAR:
+                    col = operands[k]
+                    for j in range(m):
+                        stack[sp, j] = columns[col, start + j]
+                    sp += 1
+                elif op == CONST:
+                    val = constants[operands[k]]
+                    for j in range(m):
+                        stack[sp, j] = val
+                    sp += 1
+                elif op <= 5:
+                    # binary functions
+                    sp -= 1
+                    a, b = stack[sp - 1], stack[sp]
+                    if op == 2:
+                        for j in range(m):
+                            a[j] = a[j] + b[j]
+                    elif op == 3:
+                        for j in range(m):
+                            a[j] = a[j] - b[j]
+                    elif op == 4:
+                        for j in range(m):
+                            a[j] = a[j] * b[j]
+                    else:
+                        for j in range(m):
+                            a[j] = a[j] ** b[j]
+                else:
+                    # unary functions
+                    a = stack[sp - 1]
+                    if op == 6:
+                        for j in range(m):
+                            a[j] = a[j] * a[j]
+                    elif op == 7:
+                        for j in range(m):
+                            a[j] = a[j] * a[j] * a[j]
+                    elif op == 8:
+                        for j in range(m):
+                            a[j] = 1.0 / a[j]
+                    elif op == 9:
+                        for j in range(m):
+                            a[j] = 10.0 ** a[j]
+                    elif op == 10:
+                        for j in range(m):
+                            a[j] = np.sqrt(a[j])
+                    elif op == 11:
+                        for j in range(m):
+                            a[j] = a[j] ** (1. / 3)
+                    elif op == 12:
+                        for j in range(m):
+                            a[j] = np.log(a[j])
+                    elif op == 13:
+                        for j in range(m):
+                            a[j] = np.log10(a[j])
+                    elif op == 14:
+                        for j in range(m):
+                            a[j] = np.exp(a[j])
+                    elif op == 15:
+                        for j in range(m):
+                            a[j] = abs(a[j])
+                    elif op == 16:
+                        for j in range(m):
+                            a[j] = np.sin(a[j])
+                    elif op == 17:
+                        for j in range(m):
+                            a[j] = np.cos(a[j])
+                    elif op == 18:
+                        for j in range(m):
+                            a[j] = np.tan(a[j])
+                    elif op == 19:
+                        for j in range(m):
+                            a[j] = 1.0 / np.sin(a[j])
+                    elif op == 20:
+                        for j in range(m):
+                            a[j] = 1.0 / np.cos(a[j])
+                    elif op == 21:
+                        for j in range(m):
+                            a[j] = 1.0 / np.tan(a[j])
+                    elif op == 22:
+                        for j in range(m):
+                            a[j] = np.arcsin(a[j])
+                    elif op == 23:
+                        for j in range(m):
+                            a[j] = np.arccos(a[j])
+                    elif op == 24:
+                        for j in range(m):
+                            a[j] = np.arctan(a[j])
+                    elif op == 25:
+                        for j in range(m):
+                            a[j] = 1.0 / np.arcsin(a[j])
+                    elif op == 26:
+                        for j in range(m):
+                            a[j] = 1.0 / np.arccos(a[j])
+                    elif op == 27:
+                        for j in range(m):
+                            a[j] = 1.0 / np.arctan(a[j])
+                    elif op == 28:
+                        for j in range(m):
+                            a[j] = np.sinh(a[j])
+                    elif op == 29:
+                        for j in range(m):
+                            a[j] = np.cosh(a[j])
+                    else:
+                        for j in range(m):
+                            a[j] = np.tanh(a[j])
+            for j in range(m):
+                out[p, start + j] = stack[0, j]
+
+
+# parallel -> compiled stack kernel, shared by the evaluators
+_stackKernels = {}
+
+
+def _columns(df, names):
+    '''
+    @return: float array (n_columns, n_rows), the columns of the names,
+             dict, column name -> index in the array
+    '''
+    if hasattr(df, 'columnIndices'):
+        # PyMOGEP.dataset.Dataset, the values are not copied
+        return (np.asarray(df.values), 
+                dict(zip(names, df.columnIndices(names))))
+    columns = np.empty((len(names), len(df)))
+    for idx, name in enumerate(names):
+        columns[idx] = np.asarray(df[name], dtype=np.float64)
+    return columns, dict((name, idx) for idx, name in enumerate(names))
+
+
+class JitEvaluator(Evaluator):
+    '''
+    evaluates the genes by the numba kernels. The results may differ from
+    those of numpy in the last bits, and no floating point warnings are
+    emitted.
+    '''
+
+    def __init__(self, kernel='stack', batchSize=256, parallel=False,
+                 kernelCacheSize=1024):
+        '''
+        @param kernel: string, 'stack' (one kernel for all genes) or 'fused'
+                       (one compiled kernel per structure of chromosome)
+        @param batchSize: positive integer, number of chromosomes evaluated
+                          in one call of the stack kernel
+        @param parallel: boolean, the kernels run in the threads of numba
+        @param kernelCacheSize: positive integer, maximum number of the
+                                compiled fused kernels, the least recently
+                                used ones are released
+        '''
+        if numba is None:
+            raise ImportError('JitEvaluator requires numba')
+        assert kernel in ('stack', 'fused')
+        assert batchSize > 0
+        self.kernel = kernel
+        self.batchSize = batchSize
+        self.parallel = parallel
+        # source code -> compiled fused kernel
+        self.compiled = LRUCache(kernelCacheSize)
+        if parallel not in _stackKernels:
+            _stackKernels[parallel] = numba.njit(
+                            parallel=parallel, error_model='numpy',
+                            nogil=True)(_stackKernel)
+        self._stack = _stackKernels[parallel]
+
+
+    def _compile(self, source):
+        '''@return: the compiled fused kernel of the source code'''
+        kernel = self.compiled.get(source)
+        if kernel is None:
+            namespace = dict(_NAMESPACE, prange=prange)
+            exec(compile(source, '<fused kernel>', 'exec'), namespace)
+            kernel = numba.njit(parallel=self.parallel, error_model='numpy',
+                                nogil=True)(namespace['kernel'])
+            self.compiled.put(source, kernel)
+        return kernel
+
+
+    def _evalStack(self, genes, df):
+        '''computes the encodable genes by the stack kernel'''
+        names = sorted(set(value for gene in genes
+                           for _, kind, value, _ in gene.program.instructions
+                           if kind == VARIABLE))
+        columns, columnIndex = _columns(df, names)
+
+        encoded, programs = [], []
+        for gene in genes:
+            code = encode(gene.program, columnIndex)
+            if code is not None:
+                encoded.append(gene)
+                programs.append(code)
+        if not encoded:
+            return
+
+        starts = np.cumsum([0] + [len(code[0]) for code in programs])
+        constantStarts = np.cumsum([0] + [len(code[2]) for code in programs])
+        codes = np.concatenate([code[0] for code in programs])
+        operands = np.concatenate([
+                        np.where(code[0] == CONST, code[1] + offset, code[1])
+                        for code, offset in zip(programs, constantStarts)])
+        constants = np.concatenate([code[2] for code in programs])
+        depths = np.array([code[3] for code in programs], dtype=np.int64)
+
+        out = np.empty((len(encoded), len(df)))
+        self._stack(codes, operands, starts, depths, constants, columns, out)
+        for gene, result in zip(encoded, out):
+            gene.setResult(df, result)
+
+
+    def _evalFused(self, genes, df):
+        '''computes the encodable genes by the fused kernel'''
+        encoded = [gene for gene in genes
+                   if _postfix(gene.program) is not None]
+        if not encoded:
+            return
+        source, variables, constants = fusedSource(
+                                [gene.program for gene in encoded])
+        columns, columnIndex = _columns(df, variables)
+        out = np.empty((len(encoded), len(df)))
+        self._compile(source)(columns, 
+                              np.array([columnIndex[name] for name in variables],
+                                       dtype=np.int64),
+                              np.array(constants, dtype=np.float64), out)
+        for gene, result in zip(encoded, out):
+            gene.setResult(df, result)
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, training set
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+        batchSize = self.batchSize if self.kernel == 'stack' else 1
+        for start in xrange(0, len(pending), batchSize):
+            batch = pending[start: start + batchSize]
+            genes = _distinctGenes(batch)
+            if df is not None:
+                if self.kernel == 'stack':
+                    self._evalStack(genes, df)
+                else:
+                    self._evalFused(genes, df)
+            for chro in batch:
+                _evalFitnesses(chro, df)
+            for gene in genes:
+                gene.setResult(None, None)
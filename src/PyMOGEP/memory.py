@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+bounded LRU memories shared by the whole population across generations.
+'''
+from collections import OrderedDict
+from contextlib import contextmanager
+from PyMOGEP.decorator import cacheName
+from PyMOGEP.evaluator import isEvaluated
+
+import numpy as np
+
+__all__ = ['LRUCache', 'FitnessCache', 'SubtreeCache']
+
+
+class LRUCache(object):
+    '''
+    least recently used cache with hit, miss and eviction counters.
+    '''
+
+    def __init__(self, maxSize):
+        '''
+        @param maxSize: positive integer, maximum total size of the cached
+                        items, measured by _sizeOf()
+        '''
+        assert maxSize > 0
+        self.maxSize = maxSize
+        self.usage = 0
+        self._data = OrderedDict()
+        self.resetStats()
+
+
+    def _sizeOf(self, value):
+        '''@return: size of a cached value, each item counts 1'''
+        return 1
+
+
+    def resetStats(self):
+        '''reset the hit, miss and eviction counters'''
+        self.hits = self.misses = self.evictions = 0
+
+
+    def stats(self):
+        '''@return: dict of the counters and the number of cached items'''
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._data),
+                'usage': self.usage}
+
+
+    def get(self, key, default=None):
+        '''
+        @param key: hashable key
+        @return: cached value of the key, or default if it is not cached
+        '''
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # move the key to the most recently used end
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+
+    def put(self, key, value):
+        '''
+        caches the value, and evicts the least recently used items
+        if the cache is full.
+        '''
+        if key in self._data:
+            self.usage -= self._sizeOf(self._data.pop(key))
+        self._data[key] = value
+        self.usage += self._sizeOf(value)
+        while self.usage > self.maxSize and self._data:
+            _, evicted = self._data.popitem(last=False)
+            self.usage -= self._sizeOf(evicted)
+            self.evictions += 1
+
+
+    def clear(self):
+        '''removes all cached items, the counters are kept'''
+        self._data.clear()
+        self.usage = 0
+
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FitnessCache(LRUCache):
+    '''
+    fitness values of the chromosomes keyed by Chromosome.key, the
+    structure of the evaluated regions of its genes and its linker.
+    Hence the copies made by the selector, the duplicated chromosomes and
+    the neutral mutations outside the evaluated regions are never
+    evaluated again.
+
+    the cache is only valid for one training set, it must be cleared
+    when the training set is changed.
+    '''
+
+    def evaluate(self, chromosomes, evaluator, df):
+        '''
+        sets the fitnesses of the cached chromosomes, and evaluates one
+        chromosome of each uncached key by the evaluator.
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param evaluator: PyMOGEP.evaluator
+        @param df, pandas.DataFrame, training data set
+        '''
+        name = cacheName('_fitnesses')
+        pending = OrderedDict()   # key -> list of chromosomes
+        for chro in chromosomes:
+            if isEvaluated(chro):
+                continue
+            key = chro.key
+            if key in pending:
+                # duplicated chromosome in this call
+                pending[key].append(chro)
+                self.hits += 1
+                continue
+
+            fitnesses = self.get(key)
+            if fitnesses is None:
+                pending[key] = [chro, ]
+            else:
+                setattr(chro, name, fitnesses)
+
+        evaluator.evaluate([chros[0] for chros in pending.itervalues()], df)
+        for key, chros in pending.iteritems():
+            fitnesses = chros[0].fitnesses
+            self.put(key, fitnesses)
+            for chro in chros[1:]:
+                setattr(chro, name, fitnesses)
+
+
+class SubtreeCache(LRUCache):
+    '''
+    results of the subtrees keyed by Program.signatures, the identical
+    subexpressions of different genes (e.g. x*x under different roots)
+    are computed once. The size of the cache is measured in bytes.
+
+    the cache holds the results of one data set, it is cleared when
+    the programs are run against another data set. The cache keeps
+    read-only copies of the arrays, they are shared by all genes, and the
+    computed arrays are left to their genes.
+    '''
+
+    def __init__(self, maxBytes):
+        '''
+        @param maxBytes: positive integer, memory budget of the cached arrays
+        '''
+        super(SubtreeCache, self).__init__(maxBytes)
+        self._df = None
+
+
+    def _sizeOf(self, value):
+        '''@return: number of bytes of a cached array'''
+        return getattr(value, 'nbytes', 8)
+
+
+    def bind(self, df):
+        '''clears the cache if df is not the data set of the cached results'''
+        if df is not self._df:
+            self.clear()
+            self._df = df
+
+
+    @contextmanager
+    def sharedBy(self, geneType):
+        '''
+        the genes of geneType run their programs with the cache while the
+        context is active (e.g. a population evaluating its chromosomes),
+        then the previous cache of geneType is restored.
+        @param geneType: subclass of PyMOGEP.gene.Gene
+        '''
+        owned = 'subtreeCache' in geneType.__dict__
+        previous = geneType.subtreeCache
+        geneType.subtreeCache = self
+        try:
+            yield self
+        finally:
+            if owned:
+                geneType.subtreeCache = previous
+            else:
+                del geneType.subtreeCache
+
+
+    def put(self, key, value):
+        '''caches a read-only copy of the array value'''
+        if isinstance(value, np.ndarray):
+            value = value.copy()
+            value.flags.writeable = False
+        super(SubtreeCache, self).put(key, value)
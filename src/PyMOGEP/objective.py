@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+declarative objectives of the chromosomes (Chromosome.objectives).
+
+an objective reduces the errors (prediction - target) of an output of
+the chromosome by a ufunc, e.g. the mean absolute error against the
+column 'f1' is reduce=numpy.add of transform=numpy.absolute divided by
+the number of rows.
+
+the objectives are accumulated by blocks of rows, the errors of a block
+are computed once in a small buffer for all objectives of the same
+output and target, thus the fitnesses are computed in one pass over the
+data without the full size error arrays. The root function of a gene
+(PyMOGEP.program.RootCall) is computed block by block in the same
+buffer, thus the prediction of the gene is not materialized either, only
+the arguments of its root are full size arrays. The state of an objective is
+(reduced value, number of rows), and the states of the chunks or of the
+shards of the data set are combined by Objective.merge.
+'''
+import numpy as np
+from PyMOGEP.program import RootCall
+
+__all__ = ['Objective', 'MeanAbsoluteError', 'SumAbsoluteError',
+           'MeanSquaredError', 'MaxAbsoluteError', 'accumulate']
+
+# rows of a block
+BLOCK_SIZE = 4096
+
+
+class Objective(object):
+    '''reduction of the errors of an output of the chromosome'''
+
+    def __init__(self, target, output=None, transform=np.absolute,
+                 reduce=np.add, mean=False):
+        '''
+        @param target: column name of the target values
+        @param output: integer or None, index of the output in the result
+                       of Chromosome.eval (the default linker returns the
+                       tuple of the genes), None if the result is one array
+                       (e.g. the default linker of one gene)
+        @param transform: unary numpy.ufunc or None, applied to the errors
+        @param reduce: binary numpy.ufunc, reducing the transformed errors
+        @param mean: boolean, the reduced value is divided by the number
+                     of rows
+        '''
+        self.target = target
+        self.output = output
+        self.transform = transform
+        self.reduce = reduce
+        self.mean = mean
+
+
+    def start(self):
+        '''@return: state of no rows'''
+        return (None, 0)
+
+
+    def update(self, state, errors):
+        '''
+        @param state: (reduced value, number of rows)
+        @param errors: float array, transformed errors of a block of rows
+        @return: state after accumulating the block
+        '''
+        if not len(errors):
+            return state
+        return self.merge(state, (self.reduce.reduce(errors), len(errors)))
+
+
+    def merge(self, state1, state2):
+        '''@return: state of the rows of both states'''
+        (value1, count1), (value2, count2) = state1, state2
+        if value1 is None:
+            return (value2, count1 + count2)
+        if value2 is None:
+            return (value1, count1 + count2)
+        return (self.reduce(value1, value2), count1 + count2)
+
+
+    def finish(self, state):
+        '''@return: float, value of the objective'''
+        value, count = state
+        if value is None:
+            value = self.reduce.identity
+            if value is None:
+                return float('nan')
+        if self.mean:
+            return float(value) / count if count else float('nan')
+        return float(value)
+
+
+class MeanAbsoluteError(Objective):
+    '''mean of |prediction - target|'''
+    def __init__(self, target, output=None):
+        Objective.__init__(self, target, output, np.absolute, np.add, True)
+
+
+class SumAbsoluteError(Objective):
+    '''sum of |prediction - target|'''
+    def __init__(self, target, output=None):
+        Objective.__init__(self, target, output, np.absolute, np.add, False)
+
+
+class MeanSquaredError(Objective):
+    '''mean of (prediction - target)**2'''
+    def __init__(self, target, output=None):
+        Objective.__init__(self, target, output, np.square, np.add, True)
+
+
+class MaxAbsoluteError(Objective):
+    '''maximum of |prediction - target|'''
+    def __init__(self, target, output=None):
+        Objective.__init__(self, target, output, np.absolute, np.maximum,
+                           False)
+
+
+def accumulate(objectives, states, result, df, blockSize=BLOCK_SIZE):
+    '''
+    accumulates the objectives over the rows of df in one pass
+    @param objectives: list of Objective
+    @param states: list, state of each objective, modified in place
+    @param result: result of Chromosome.eval(df), the outputs may be
+                   PyMOGEP.program.RootCall computed block by block
+    @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, data set
+    @param blockSize: positive integer, rows of a block
+    @return: states
+    '''
+    n_rows = len(df)
+    groups = {}     # (output, target) -> [index of objective,...]
+    for idx, objective in enumerate(objectives):
+        groups.setdefault((objective.output, objective.target), []).append(idx)
+
+    pairs = []
+    for (output, target), members in groups.iteritems():
+        # the output of an array result would index its rows
+        if output is None:
+            assert not isinstance(result, (tuple, list))
+            prediction = result
+        else:
+            assert (isinstance(result, (tuple, list)) and 
+                    0 <= output < len(result))
+            prediction = result[output]
+        if isinstance(prediction, RootCall):
+            assert all(np.shape(arg) in ((), (n_rows, )) 
+                       for arg in prediction.args)
+        else:
+            prediction = np.asarray(prediction)
+            if prediction.ndim:
+                assert prediction.shape == (n_rows, )
+        pairs.append((prediction, np.asarray(df[target]), members))
+
+    errors = np.empty(min(blockSize, n_rows))
+    transformed = np.empty(min(blockSize, n_rows))
+    for start in xrange(0, n_rows, blockSize):
+        stop = min(start + blockSize, n_rows)
+        for prediction, target, members in pairs:
+            block = errors[:stop - start]
+            if isinstance(prediction, RootCall):
+                # the root of the gene is computed in the error buffer
+                np.subtract(prediction.block(start, stop, block), 
+                            target[start: stop], out=block)
+            else:
+                np.subtract(prediction[start: stop] if prediction.ndim
+                            else prediction, target[start: stop], out=block)
+            for idx in members:
+                transform = objectives[idx].transform
+                values = (block if transform is None else
+                          transform(block, out=transformed[:stop - start]))
+                states[idx] = objectives[idx].update(states[idx], values)
+    return states
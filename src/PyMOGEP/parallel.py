@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+parallel fitness evaluation by a pool of worker processes.
+
+the chromosomes are shipped to the workers by their compact encodings
+(Chromosome.encode), and the workers send the fitnesses back, which are
+stored in the fitness cache of the chromosomes in the main process.
+
+the data set is given to the workers once, when the pool is created. On
+posix systems the workers are forked, thus they inherit the data set (and
+the class attributes such as Population.train_df) without copying.
+
+ProcessPoolEvaluator.submit evaluates the chromosomes without blocking,
+for the asynchronous steady-state evolution (PyMOGEP.steadystate).
+'''
+import multiprocessing as mp
+import traceback
+from PyMOGEP.decorator import cacheName
+from PyMOGEP.evaluator import (Evaluator, isEvaluated)
+
+__all__ = ['ProcessPoolEvaluator', ]
+
+# data set and evaluator of the worker process
+_workerDf = None
+_workerEvaluator = None
+
+
+def _initWorker(df, evaluator):
+    '''initializer of the worker processes'''
+    global _workerDf, _workerEvaluator
+    _workerDf, _workerEvaluator = df, evaluator
+
+
+def _evalChunk(task):
+    '''
+    evaluates a chunk of chromosomes in the worker process
+    @param task: (chromosome class, headLength, linker, list of encodings)
+    @return: list of fitnesses
+    '''
+    chroType, headLength, linker, encodings = task
+    chromosomes = [chroType.decode(encoding, headLength, linker)
+                   for encoding in encodings]
+    _workerEvaluator.evaluate(chromosomes, _workerDf)
+    return [chro.fitnesses for chro in chromosomes]
+
+
+def _submitChunk(task):
+    '''
+    evaluates a submitted chunk of chromosomes in the worker process
+    @return: (True, list of fitnesses) or (False, traceback)
+    '''
+    try:
+        return True, _evalChunk(task)
+    except Exception:
+        return False, traceback.format_exc()
+
+
+class ProcessPoolEvaluator(Evaluator):
+    '''
+    evaluates the chromosomes by a pool of worker processes.
+
+    the results are the same as the serial evaluator, because the workers
+    only evaluate the chromosomes and the order of the results is kept,
+    thus the evolution is deterministic with respect to the random seed.
+
+    the pool is kept across the generations and the solve() calls of the
+    populations, it is owned by the caller creating the evaluator, which
+    closes it by close() or by the with statement:
+        with ProcessPoolEvaluator(4) as evaluator:
+            Population(chro, popSize, headLength, 
+                       evaluator=evaluator).solve(n_generation)
+    '''
+
+    def __init__(self, n_processes=None, evaluator=None, chunksPerProcess=4):
+        '''
+        @param n_processes: positive integer, number of worker processes,
+                            default is the number of cpus
+        @param evaluator: PyMOGEP.evaluator, evaluator in the workers,
+                          default is evaluating the chromosomes one by one
+        @param chunksPerProcess: positive integer, the chromosomes are split
+                                 to n_processes * chunksPerProcess tasks
+        '''
+        self.n_processes = n_processes if n_processes else mp.cpu_count()
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self.chunksPerProcess = chunksPerProcess
+        self._pool = None
+        self._df = None
+
+
+    def _getPool(self, df):
+        '''@return: the pool of worker processes holding df'''
+        if self._pool is None or df is not self._df:
+            self.close()
+            self._pool = mp.Pool(self.n_processes, initializer=_initWorker,
+                                 initargs=(df, self.evaluator))
+            self._df = df
+        return self._pool
+
+
+    def evaluate(self, chromosomes, df):
+        '''
+        @param chromosomes: list of PyMOGEP.chromosome
+        @param df, pandas.DataFrame, training data set
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+        if not pending:
+            return
+
+        # the chromosomes of a task must share the class, head and linker
+        groups = {}
+        for chro in pending:
+            key = (type(chro), chro.headLength, chro.linker)
+            groups.setdefault(key, []).append(chro)
+
+        n_chunks = self.n_processes * self.chunksPerProcess
+        tasks, members = [], []
+        for (chroType, headLength, linker), chros in groups.iteritems():
+            chunkSize = max(1, -(-len(chros) // n_chunks))
+            for start in xrange(0, len(chros), chunkSize):
+                chunk = chros[start: start + chunkSize]
+                tasks.append((chroType, headLength, linker,
+                              [chro.encode() for chro in chunk]))
+                members.append(chunk)
+
+        results = self._getPool(df).map(_evalChunk, tasks)
+        name = cacheName('_fitnesses')
+        for chunk, fitnesses in zip(members, results):
+            for chro, fitness in zip(chunk, fitnesses):
+                setattr(chro, name, fitness)
+
+
+    def submit(self, chromosomes, df, callback):
+        '''
+        evaluates the chromosomes by a worker without blocking, the
+        fitnesses are stored in the chromosomes before calling 
+        callback(chromosomes, error), where error is None or the traceback
+        of the worker. The callback is called in the result thread of the
+        pool, thus it should only pass the chromosomes to the main thread
+        (e.g. by a Queue.Queue).
+        @param chromosomes: list of PyMOGEP.chromosome with the same class,
+                            headLength and linker
+        @param df, pandas.DataFrame, training data set
+        @param callback: function(chromosomes, error)
+        '''
+        pending = [chro for chro in chromosomes if not isEvaluated(chro)]
+        if not pending:
+            callback(chromosomes, None)
+            return
+
+        chro = pending[0]
+        task = (type(chro), chro.headLength, chro.linker,
+                [chro.encode() for chro in pending])
+        name = cacheName('_fitnesses')
+
+        def done(result):
+            ok, value = result
+            if not ok:
+                callback(chromosomes, value)
+                return
+            for chro, fitness in zip(pending, value):
+                setattr(chro, name, fitness)
+            callback(chromosomes, None)
+
+        self._getPool(df).apply_async(_submitChunk, (task, ), callback=done)
+
+
+    def close(self):
+        '''terminates the worker processes'''
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool, self._df = None, None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
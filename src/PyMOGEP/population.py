@@ -9,15 +9,21 @@ multi-objective algorithm: NSGA-II
 '''
 
 from time import time
-import random
+import os
 import numpy as np
+from PyMOGEP.decorator import cacheName
+from PyMOGEP.gene import CompactGene
 from PyMOGEP.evolution.linker import defaultLinker
-from PyMOGEP.sort import (JensenSort, DebSort)
+from PyMOGEP.evaluator import (Evaluator, BatchEvaluator)
+from PyMOGEP.dataset import Dataset
+from PyMOGEP.memory import (FitnessCache, SubtreeCache)
+from PyMOGEP.sort import (JensenSort, DebSort, MatrixSort, ENSSort)
 from PyMOGEP.evolution.selector import binaryTournamentSelection
 from PyMOGEP.evolution.crossover import *
 from PyMOGEP.evolution.mutator import *
 from PyMOGEP.evolution.transposer import *
 from PyMOGEP.evolution.comparison import *
+from PyMOGEP.evolution.matrix import *
 
 
 class Population(object):
@@ -34,8 +40,11 @@ class Population(object):
     crossoverOnePointRate = 0.3
     crossoverTwoPointsRate = 0.3
     crossoverGeneRate = 0.1
-    train_df = None   #data frame
+    train_df = None   #data frame or PyMOGEP.dataset.Dataset
     valid_df = None
+
+    # counters of the evolution saved in the checkpoints
+    _checkpointAttributes = ('_generation', )
     
     gen = property(lambda self: self._generation, doc='Generation')
     bestFront = property(
@@ -45,7 +54,11 @@ class Population(object):
 
     def __init__(self, chro, popSize, headLength, n_genes=1, n_elites=1,
                  linker=defaultLinker, RNCGenerator=None, 
-                 defaultChro=None, nonDuplicatePop=True, verbose=False):
+                 defaultChro=None, nonDuplicatePop=True, evaluator=None,
+                 fitnessCacheSize=0, subtreeCacheBytes=0, 
+                 matrixEvolution=False, sortEngine='jensen', 
+                 sortChunkSize=None, survival=None, rng=None, 
+                 initMethod='uniform', verbose=False):
         '''
         @param chro, PyMOGEP.chromosome, user defined chromosome
         @param popSize, positive integer, population size
@@ -59,18 +72,60 @@ class Population(object):
         @param defaultChro, PyMOGEP.chromosome, user specified chromsome
                             instanace
         @param nonDuplicatePop, boolean, initialize non-duplicate fitness
-                            population
+                            population, the chromosomes of the same 
+                            structure (Chromosome.key) are dropped 
+                            before the evaluation
+        @param evaluator, PyMOGEP.evaluator, fitness evaluator of the 
+                          chromosomes, default is evaluating the 
+                          chromosomes one by one, and the initial 
+                          chromosomes are evaluated in batches
+                          (PyMOGEP.evaluator.BatchEvaluator). The 
+                          population does not
+                          close the given evaluator (e.g. the pool of
+                          PyMOGEP.parallel.ProcessPoolEvaluator)
+        @param fitnessCacheSize, non-negative integer, maximum number of 
+                          fitnesses cached by the structure of the 
+                          chromosomes across generations, 0 for no cache
+        @param subtreeCacheBytes, non-negative integer, memory budget of
+                          the results of the subtrees shared by the genes
+                          while the population evaluates the chromosomes,
+                          0 for no cache
+        @param matrixEvolution, boolean, applying the genetic operators to 
+                          the code matrix of the whole population
+                          (PyMOGEP.evolution.matrix)
+        @param sortEngine, string, non-dominated sorting algorithm,
+                          'jensen': PyMOGEP.sort.JensenSort,
+                          'matrix': PyMOGEP.sort.MatrixSort on the fitness 
+                          matrix of the population,
+                          'ens': PyMOGEP.sort.ENSSort, the offspring are 
+                          inserted into the fronts of the parents
+        @param sortChunkSize, positive integer or None, the matrix sorting
+                          compares blocks of sortChunkSize rows instead of 
+                          keeping the domination matrix, for bounding the 
+                          memory of large populations
+        @param survival, survival strategy choosing the chromosomes of the
+                          last selected front by select(ParetoFronts, 
+                          lastFront, n_remaining), e.g. 
+                          PyMOGEP.evolution.survival.ReferencePointSurvival,
+                          default is by the crowding distance (NSGA-II),
+                          a survival without rng gets the rng of the 
+                          population
+        @param rng, numpy.random.RandomState, integer seed or None, random 
+                          generator of the initialization and the genetic 
+                          operators, default is the global state of 
+                          numpy.random. Give the same generator to 
+                          RNCGenerator (e.g. rng.randn) for a run 
+                          independent of the global random state.
+        @param initMethod, string, initialization of the chromosomes,
+                          'uniform': the alleles are uniformly drawn, 
+                          'ramped': ramped half-and-half
+                          (Chromosome.randomChromosomes)
         '''
-        assert popSize > 0 and headLength > 0 and n_genes > 0
-        self.popSize = popSize
-        self.headLength = headLength
-        self.n_genes = n_genes
-        self.n_elites = n_elites
-        self.linker = linker
-        self._generation = 0
-        self.selector = binaryTournamentSelection
-        self.RNCGenerator = RNCGenerator    
-        self.verbose = verbose
+        assert initMethod in ('uniform', 'ramped')
+        self._configure(chro, popSize, headLength, n_genes, n_elites, linker,
+                        RNCGenerator, evaluator, fitnessCacheSize, 
+                        subtreeCacheBytes, matrixEvolution, sortEngine, 
+                        sortChunkSize, survival, rng, verbose)
         
         #population initialization, each chromosome with different fitness values.
         if defaultChro:
@@ -81,20 +136,39 @@ class Population(object):
             
         t0 = time()
         
+        # the initial chromosomes are many, thus they are evaluated in
+        # batches unless the user gives the evaluator
+        initEvaluator = self.evaluator if evaluator else BatchEvaluator()
         fitness_set = set()
+        key_set = set(defChro.key for defChro in self.population)
         while len(self.population) < popSize:
-            chro = chro.randomChromosome(headLength, n_genes, linker, self.RNCGenerator)
+            candidates = chro.randomChromosomes(popSize - len(self.population),
+                            headLength, n_genes, linker, self.RNCGenerator,
+                            self.rng, initMethod == 'ramped')
             if nonDuplicatePop:
-                if chro.fitnesses not in fitness_set:
-                    fitness_set.add(chro.fitnesses)
-                    self.population.append(chro)
-            else:
-                self.population.append(chro)
-                if verbose:
-                    print "train:%s-%s, %s chromosome initialized, fitnesses:%s"%(
-                        type(self).train_df.index[0],
-                        type(self).train_df.index[-1],
-                        len(self.population), chro.fitnesses)
+                # the chromosomes of the same structure have the same
+                # fitnesses, thus only the first one is evaluated
+                unique = []
+                for candidate in candidates:
+                    key = candidate.key
+                    if key not in key_set:
+                        key_set.add(key)
+                        unique.append(candidate)
+                candidates = unique
+
+            self._evaluate(candidates, initEvaluator)
+            for candidate in candidates:
+                if nonDuplicatePop:
+                    if candidate.fitnesses not in fitness_set:
+                        fitness_set.add(candidate.fitnesses)
+                        self.population.append(candidate)
+                else:
+                    self.population.append(candidate)
+                    if verbose:
+                        print "train:%s-%s, %s chromosome initialized, fitnesses:%s"%(
+                            type(self).train_df.index[0],
+                            type(self).train_df.index[-1],
+                            len(self.population), candidate.fitnesses)
         
         if self.verbose:
             for chro in self.population:
@@ -102,19 +176,85 @@ class Population(object):
                 print chro
             print "nonduplicate random chromosome initialized, %.3f secs"%(time() - t0)
         
-        # placeholder for next generation
-        self._nextPopulation = [] 
-        
         # placeholder for Pareto front
         self.n_objectives = self.population[0].n_objectives
         self.ParetoFronts = self._fastNonDominatedSort(self.population)
-        [self._crowdingDistanceAssignment(front) for front in self.ParetoFronts]
+        self._allCrowdingDistanceAssignment(self.ParetoFronts)
         
         if self.verbose:
             print "n_objctives:", self.n_objectives
             print "initialize population, %.3f secs"%(time() - t0)
 
 
+    def _configure(self, chro, popSize, headLength, n_genes=1, n_elites=1,
+                   linker=defaultLinker, RNCGenerator=None, evaluator=None,
+                   fitnessCacheSize=0, subtreeCacheBytes=0, 
+                   matrixEvolution=False, sortEngine='jensen', 
+                   sortChunkSize=None, survival=None, rng=None, 
+                   verbose=False):
+        '''
+        sets the parameters of the population, shared by __init__ and 
+        load(), see __init__ for the parameters.
+        '''
+        assert sortEngine in ('jensen', 'matrix', 'ens')
+        assert popSize > 0 and headLength > 0 and n_genes > 0
+        self.popSize = popSize
+        self.headLength = headLength
+        self.n_genes = n_genes
+        self.n_elites = n_elites
+        self.linker = linker
+        self._generation = 0
+        self.selector = binaryTournamentSelection
+        self.RNCGenerator = RNCGenerator    
+        self.matrixEvolution = matrixEvolution
+        self.sortEngine = sortEngine
+        self.sortChunkSize = sortChunkSize
+        self.survival = survival
+        if rng is None:
+            self.rng = np.random
+        elif isinstance(rng, np.random.RandomState):
+            self.rng = rng
+        else:
+            self.rng = np.random.RandomState(rng)
+        if survival is not None and getattr(survival, 'rng', False) is None:
+            survival.rng = self.rng
+        self.evaluator = evaluator if evaluator else Evaluator()
+        self.fitnessCache = (FitnessCache(fitnessCacheSize) 
+                             if fitnessCacheSize else None)
+        self.subtreeCache = (SubtreeCache(subtreeCacheBytes)
+                             if subtreeCacheBytes else None)
+        self.verbose = verbose
+        if isinstance(type(self).train_df, Dataset):
+            # the variables of the chromosome must be columns of the data set
+            type(self).train_df.columnIndices(chro.variables)
+
+        # placeholder for next generation
+        self._nextPopulation = [] 
+
+
+    def _evaluate(self, chromosomes, evaluator=None):
+        '''
+        computing fitnesses of the chromosomes against the training set
+        @param evaluator: PyMOGEP.evaluator, default is self.evaluator
+        '''
+        if evaluator is None:
+            evaluator = self.evaluator
+        if self.subtreeCache is not None and chromosomes:
+            with self.subtreeCache.sharedBy(chromosomes[0].gene_type):
+                self._evaluateChromosomes(chromosomes, evaluator)
+        else:
+            self._evaluateChromosomes(chromosomes, evaluator)
+
+
+    def _evaluateChromosomes(self, chromosomes, evaluator):
+        '''evaluates the chromosomes by the fitness cache or the evaluator'''
+        if self.fitnessCache is not None:
+            self.fitnessCache.evaluate(chromosomes, evaluator, 
+                                       type(self).train_df)
+        else:
+            evaluator.evaluate(chromosomes, type(self).train_df)
+    
+    
     def _crowdingDistanceAssignment(self, nonDominatedSet):
         '''       
         The overall crowding-distance value is calculated as
@@ -123,41 +263,42 @@ class Population(object):
         the larger distance, the better chromosome
         @param nondominatedSet: one set of the Pareto front
         '''
-        length = len(nonDominatedSet)
-    
-        # initialize distance
-        for chro in nonDominatedSet:
-            chro.crowdingDistance = 0.0
+        if not nonDominatedSet:
+            return nonDominatedSet
         
-        # sorting by each objective(fitness)
-        for idx in xrange(self.n_objectives):
-            #sort idx-th objective (ascend)
-            nonDominatedSet = sorted(nonDominatedSet,
-                                key=lambda chro: chro.fitnesses[idx])
-                           
-            minObjValue = nonDominatedSet[0].fitnesses[idx]
-            maxObjValue = nonDominatedSet[-1].fitnesses[idx]
-            
-            nonDominatedSet[0].crowdingDistance = float("inf")
-            nonDominatedSet[-1].crowdingDistance = float("inf")
-            
-            for jdx in xrange(1, length - 1):
-                if minObjValue != maxObjValue:
-                #  in small pop, minObjVal may be the same as maxObjVal 
-                    nonDominatedSet[jdx].crowdingDistance += (
-                        nonDominatedSet[jdx + 1].fitnesses[idx] - 
-                        nonDominatedSet[jdx - 1].fitnesses[idx]) / (
-                        maxObjValue - minObjValue)
-                else:
-                    nonDominatedSet[jdx].crowdingDistance += (
-                        nonDominatedSet[jdx + 1].fitnesses[idx] - 
-                        nonDominatedSet[jdx - 1].fitnesses[idx])
-                
-        return nonDominatedSet
+        F = MatrixSort.fitnessMatrix(nonDominatedSet)
+        distances = MatrixSort.crowdingDistances(F)
+        for chro, distance in zip(nonDominatedSet, distances.tolist()):
+            chro.crowdingDistance = distance
+        
+        # sorted by the last objective as the sequential sorts of objectives
+        return [nonDominatedSet[idx] for idx in np.lexsort(F.T)]
+    
+    
+    def _allCrowdingDistanceAssignment(self, ParetoFronts):
+        '''
+        computing the crowding distances of all fronts at once
+        @param ParetoFronts: all Pareto fronts (list of non-dominated set)
+        '''
+        population = [chro for front in ParetoFronts for chro in front]
+        ranks = np.repeat(np.arange(len(ParetoFronts)), 
+                          [len(front) for front in ParetoFronts])
+        distances = MatrixSort.crowdingDistances(
+                        MatrixSort.fitnessMatrix(population), ranks)
+        for chro, distance in zip(population, distances.tolist()):
+            chro.crowdingDistance = distance
     
     
     def _fastNonDominatedSort(self, population):
         '''@return all Pareto fronts (list of non-dominated set)'''
+        if self.sortEngine == 'ens':
+            return ENSSort.ENSNonDominatedSort(population)
+        
+        if self.sortEngine == 'matrix':
+            ranks = MatrixSort.nonDominatedRanks(
+                        MatrixSort.fitnessMatrix(population), self.sortChunkSize)
+            return MatrixSort.ranksToFronts(population, ranks)
+        
         if self.n_objectives == 1:
             population.sort(key=lambda chro: chro.fitnesses[0]) #ascending
             ParetoFronts = [[population[0]], ]
@@ -179,94 +320,330 @@ class Population(object):
     
     
     def evolution(self, population):
+        if self.matrixEvolution:
+            return self._matrixEvolution(population)
+        
+        rng = self.rng
+        
         #inversion
-        population = [inversion(chro, self.inversionRate) for chro in population]
+        population = [inversion(chro, self.inversionRate, rng) 
+                      for chro in population]
         
         # Insertion Sequence transposition
-        population = [transposeIS(chro, random.choice(self.transISLength),
-                        self.transISRate) for chro in population ]
+        lengths = rng.choice(self.transISLength, len(population)).tolist()
+        population = [transposeIS(chro, length, self.transISRate, rng) 
+                      for chro, length in zip(population, lengths)]
         
         # Root Insert Sequence transposition
-        population = [transposeRIS(chro, random.choice(self.transRISLength),
-                        self.transRISRate) for chro in population]
+        lengths = rng.choice(self.transRISLength, len(population)).tolist()
+        population = [transposeRIS(chro, length, self.transRISRate, rng) 
+                      for chro, length in zip(population, lengths)]
         
         # Gene transposition
-        population = [transposeGene(chro, self.transGeneRate) for chro in population]
+        population = [transposeGene(chro, self.transGeneRate, rng) 
+                      for chro in population]
            
-        # mutation
-        population = [mutation(chro, self.mutationRate) 
-                      for chro in population if self.mutationRate]
+        # mutation, the random numbers of all chromosomes are drawn at once
+        if self.mutationRate:
+            draws = rng.random_sample((len(population), 2, self.n_genes, 
+                                       len(population[0].genes[0])))
+            population = [mutation(chro, self.mutationRate, rng, chroDraws)
+                          for chro, chroDraws in zip(population, draws)]
         
         # crossover
-        for idx, jdx in crossoverPairs(self.popSize, self.crossoverOnePointRate):
+        for idx, jdx in crossoverPairs(len(population), 
+                                       self.crossoverOnePointRate, rng):
             par1, par2 = population[idx], population[jdx]            
-            child1, child2 = crossoverOnePoint(par1, par2)
+            child1, child2 = crossoverOnePoint(par1, par2, rng)
             population[idx], population[jdx] = child1, child2
 
-        for idx, jdx in crossoverPairs(self.popSize, self.crossoverTwoPointsRate):
+        for idx, jdx in crossoverPairs(len(population), 
+                                       self.crossoverTwoPointsRate, rng):
             par1, par2 = population[idx], population[jdx]            
-            child1, child2 = crossoverTwoPoints(par1, par2)
+            child1, child2 = crossoverTwoPoints(par1, par2, rng)
             population[idx], population[jdx] = child1, child2
 
-        for idx, jdx in crossoverPairs(self.popSize, self.crossoverGeneRate):
+        for idx, jdx in crossoverPairs(len(population), 
+                                       self.crossoverGeneRate, rng):
             par1, par2 = population[idx], population[jdx]            
-            child1, child2 = crossoverGene(par1, par2)
+            child1, child2 = crossoverGene(par1, par2, rng)
             population[idx], population[jdx] = child1, child2
         
         return population
     
     
+    def _matrixEvolution(self, population):
+        '''
+        the same operators as evolution() on the code matrix, but the 
+        changed genes keep their RNC constants instead of drawing new ones
+        (PyMOGEP.evolution.matrix), and the random numbers are drawn in a 
+        different order, thus the offspring differ from those of evolution()
+        '''
+        chroType = type(population[0])
+        n_functions, n_terminals = len(chroType.functions), len(chroType.terminals)
+        
+        rng = self.rng
+        
+        codes, Dc = encodePopulation(population)
+        newCodes = matrixInversion(codes, self.inversionRate, self.headLength,
+                                   rng)
+        newCodes = matrixTransposeIS(newCodes, self.transISRate, 
+                                     self.headLength, self.transISLength, rng)
+        newCodes = matrixTransposeRIS(newCodes, self.transRISRate, 
+                        self.headLength, self.transRISLength, n_functions, rng)
+        newCodes, newDc = matrixTransposeGene(newCodes, Dc, self.transGeneRate,
+                                              rng)
+        if self.mutationRate:
+            newCodes = matrixMutation(newCodes, self.mutationRate, 
+                                self.headLength, n_functions, n_terminals, rng)
+        
+        newCodes = matrixCrossoverOnePoint(newCodes, self.crossoverOnePointRate,
+                                           rng)
+        newCodes = matrixCrossoverTwoPoints(newCodes, 
+                                            self.crossoverTwoPointsRate, rng)
+        newCodes, newDc = matrixCrossoverGene(newCodes, newDc, 
+                                              self.crossoverGeneRate, rng)
+        return decodePopulation(population, codes, Dc, newCodes, newDc)
+    
+    
     def evolve(self):
         '''execute the following procedure in each generation'''
         # produce offspring        
-        offspring = self.selector(self.population)
+        offspring = self.selector(self.population, rng=self.rng)
         offspring = self.evolution(offspring)    
+        self._evaluate(offspring)
         
-        mixedPopulation = self.population + offspring
-        mixedParetoFronts = self._fastNonDominatedSort(mixedPopulation)
+        if self.sortEngine == 'ens':
+            # the fronts of the parents are kept, the offspring are inserted
+            mixedParetoFronts = ENSSort.insertNonDominatedSort(
+                        [list(front) for front in self.ParetoFronts], offspring)
+        else:
+            mixedParetoFronts = self._fastNonDominatedSort(
+                                        self.population + offspring)
         
         assert sum(len(front) for front in mixedParetoFronts) == 2 * self.popSize
         
-        # fill out the next population set
-        self._nextPopulation = []
+        # fill out the next Pareto fronts
+        nextParetoFronts = []
         
         #preserve the elite Pareto front
         for idx in xrange(self.n_elites):
-            self._nextPopulation.extend(
+            nextParetoFronts.append(
                 self._crowdingDistanceAssignment(mixedParetoFronts[idx])
             )
+        n_chros = sum(len(front) for front in nextParetoFronts)
         
         #the n_rank in Pareto may less than n_elite 
         if len(mixedParetoFronts) > self.n_elites:
             idx = self.n_elites
        
-            while (len(self._nextPopulation) + len(mixedParetoFronts[idx])) <= self.popSize:
-                self._nextPopulation.extend(
+            while (n_chros + len(mixedParetoFronts[idx])) <= self.popSize:
+                nextParetoFronts.append(
                         self._crowdingDistanceAssignment(mixedParetoFronts[idx])
                         )
+                n_chros += len(mixedParetoFronts[idx])
                 idx += 1
             self._crowdingDistanceAssignment(mixedParetoFronts[idx])
     
-            if len(self._nextPopulation) < self.popSize:
+            if n_chros < self.popSize:
                 #fullfill the popSize
-                mixedParetoFronts[idx].sort(cmp=partialOrder, reverse=True)
-                reminderLength = self.popSize - len(self._nextPopulation)
-                self._nextPopulation.extend(mixedParetoFronts[idx][:reminderLength])
+                reminderLength = self.popSize - n_chros
+                if self.survival is not None:
+                    nextParetoFronts.append(self.survival.select(
+                        nextParetoFronts, mixedParetoFronts[idx], reminderLength))
+                else:
+                    mixedParetoFronts[idx].sort(cmp=partialOrder, reverse=True)
+                    nextParetoFronts.append(
+                        mixedParetoFronts[idx][:reminderLength])
         
-        if len(self._nextPopulation) > self.popSize:
-            self._nextPopulation = self._nextPopulation[:self.popSize]
+        # the selected fronts are the better fronts of the mixed population,
+        # thus the ranks are kept and the population is not sorted again,
+        # only the truncated fronts need new crowding distances.
+        self._nextPopulation, self.ParetoFronts = [], []
+        for rank, front in enumerate(nextParetoFronts, 1):
+            front = front[:self.popSize - len(self._nextPopulation)]
+            if not front:
+                break
+            if len(front) < len(mixedParetoFronts[rank - 1]):
+                self._crowdingDistanceAssignment(front)
+            for chro in front:
+                chro.ParetoRank = rank
+            self.ParetoFronts.append(front)
+            self._nextPopulation.extend(front)
         
         assert len(self._nextPopulation) == self.popSize
 
-        # update population, Pareto fronts and crowding distance
+        # update population
         self._nextPopulation, self.population = [], self._nextPopulation
-        self.ParetoFronts = self._fastNonDominatedSort(self.population)
-        [self._crowdingDistanceAssignment(front) for front in self.ParetoFronts]
         
         # update information
         self._generation += 1
-     
- 
+
+
+    def emigrants(self, n_migrants):
+        '''
+        @param n_migrants: positive integer
+        @return: list of at most n_migrants chromosomes of the best front,
+                 the less crowded ones first
+        '''
+        return sorted(self.bestFront, cmp=partialOrder,
+                      reverse=True)[:n_migrants]
+
+
+    def immigrate(self, chromosomes):
+        '''
+        replaces the worst chromosomes (the worst fronts, the most crowded
+        ones first) by the migrants, and sorts the population again.
+        @param chromosomes: list of PyMOGEP.chromosome, the migrants
+        '''
+        chromosomes = list(chromosomes[:self.popSize])
+        if not chromosomes:
+            return
+        self._evaluate(chromosomes)
+        survivors = sorted(self.population, cmp=partialOrder, reverse=True)
+        self.population = (survivors[:self.popSize - len(chromosomes)] +
+                           chromosomes)
+        self.ParetoFronts = self._fastNonDominatedSort(self.population)
+        self._allCrowdingDistanceAssignment(self.ParetoFronts)
+
+
+    def save(self, path):
+        '''
+        checkpoints the population into a compressed numpy archive: the
+        code and RNC constant arrays of the chromosomes, the fitness
+        matrix, the Pareto fronts, the crowding distances, the counters of
+        the evolution and the states of the random generators (the rng of
+        the population, which may be the global numpy.random, and the own
+        rng of the survival). The archive is written
+        to a temporary file first, thus a crash when saving does not
+        destroy the last checkpoint.
+        @param path: string, file name of the archive
+        '''
+        positions = dict((id(chro), idx)
+                         for idx, chro in enumerate(self.population))
+        fronts = [positions[id(chro)] for front in self.ParetoFronts
+                  for chro in front]
+        codes, Dc = encodePopulation(self.population)
+        _, rngKeys, rngPos, rngHasGauss, rngGauss = self.rng.get_state()
+
+        arrays = {
+            'shape': np.array([self.popSize, self.headLength, self.n_genes]),
+            'codes': codes,
+            'fitnesses': MatrixSort.fitnessMatrix(self.population),
+            'fronts': np.array(fronts, dtype=np.int64),
+            'frontSizes': np.array([len(front) for front in self.ParetoFronts],
+                                   dtype=np.int64),
+            'crowdingDistances': np.array([chro.crowdingDistance
+                                           for chro in self.population],
+                                          dtype=np.float64),
+            'ids': np.array([chro.chromosomeID for chro in self.population] +
+                            [type(self.population[0])._id_counter],
+                            dtype=np.int64),
+            'counters': np.array([getattr(self, name) for name in
+                                  self._checkpointAttributes], dtype=np.int64),
+            'rngKeys': rngKeys,
+            'rngState': np.array([rngPos, rngHasGauss, rngGauss]),
+            'globalRng': np.array(self.rng is np.random),
+        }
+        if Dc is not None:
+            arrays['Dc'] = Dc
+        survivalRng = getattr(self.survival, 'rng', None)
+        if isinstance(survivalRng, np.random.RandomState) and (
+                survivalRng is not self.rng):
+            _, rngKeys, rngPos, rngHasGauss, rngGauss = survivalRng.get_state()
+            arrays['survivalRngKeys'] = rngKeys
+            arrays['survivalRngState'] = np.array([rngPos, rngHasGauss, 
+                                                   rngGauss])
+
+        tmpPath = path + '.tmp'
+        with open(tmpPath, 'wb') as fout:
+            np.savez_compressed(fout, **arrays)
+        os.rename(tmpPath, path)
+
+
+    @classmethod
+    def load(cls, path, chro, **kwargs):
+        '''
+        class method for resuming the population checkpointed by save(),
+        the random generators are restored as well, thus the evolution
+        continues with the same trajectory as the saved population. The
+        global state of numpy.random is only restored if the rng of the
+        population is numpy.random, and the saved population drew from it.
+        @param path: string, file name of the archive
+        @param chro: PyMOGEP.chromosome, class of the saved chromosomes
+        @param kwargs: the other parameters of the population (__init__),
+                       e.g. linker, RNCGenerator, evaluator, which are not
+                       saved and must be the same as the saved population,
+                       the parameters of the initialization are ignored
+        @return: the population
+        '''
+        for name in ('defaultChro', 'nonDuplicatePop', 'initMethod'):
+            kwargs.pop(name, None)
+        with np.load(path) as archive:
+            arrays = dict(archive.items())
+        popSize, headLength, n_genes = arrays['shape'].tolist()
+        linker = kwargs.get('linker', defaultLinker)
+        RNCGenerator = kwargs.get('RNCGenerator')
+        codes, Dc = arrays['codes'], arrays.get('Dc')
+        fitnesses = [tuple(row) for row in arrays['fitnesses'].tolist()]
+        ids = arrays['ids'].tolist()
+        name = cacheName('_fitnesses')
+
+        population = []
+        for chroIdx in xrange(popSize):
+            genes = []
+            for geneIdx in xrange(n_genes):
+                gene = chro.gene_type([chro.alphabet[code] for code in
+                                       codes[chroIdx, geneIdx].tolist()],
+                                      headLength)
+                if Dc is not None:
+                    constants = Dc[chroIdx, geneIdx]
+                    gene.Dc = (constants.copy() if isinstance(gene, CompactGene)
+                               else constants.tolist())
+                    gene.RNCGenerator = RNCGenerator
+                genes.append(gene)
+            newChro = chro(genes, headLength, linker, RNCGenerator)
+            newChro._id = ids[chroIdx]
+            setattr(newChro, name, fitnesses[chroIdx])
+            population.append(newChro)
+        chro._id_counter = ids[-1]
+
+        # the saved population is not initialized and sorted again
+        pop = cls.__new__(cls)
+        pop._configure(chro, popSize, headLength, n_genes, **kwargs)
+        pop.population = population
+        pop.n_objectives = arrays['fitnesses'].shape[1]
+        pop.ParetoFronts, start = [], 0
+        fronts = arrays['fronts'].tolist()
+        for rank, size in enumerate(arrays['frontSizes'].tolist(), 1):
+            front = [population[idx] for idx in fronts[start: start + size]]
+            for member in front:
+                member.ParetoRank = rank
+            pop.ParetoFronts.append(front)
+            start += size
+        for member, distance in zip(population,
+                                    arrays['crowdingDistances'].tolist()):
+            member.crowdingDistance = distance
+        for attr, value in zip(cls._checkpointAttributes,
+                               arrays['counters'].tolist()):
+            setattr(pop, attr, value)
+
+        if pop.rng is np.random and not arrays['globalRng']:
+            # the own rng of the saved population
+            pop.rng = np.random.RandomState()
+            if getattr(pop.survival, 'rng', None) is np.random:
+                pop.survival.rng = pop.rng
+        rngPos, rngHasGauss, rngGauss = arrays['rngState'].tolist()
+        pop.rng.set_state(('MT19937', arrays['rngKeys'], int(rngPos),
+                           int(rngHasGauss), rngGauss))
+        if 'survivalRngKeys' in arrays:
+            rngPos, rngHasGauss, rngGauss = arrays['survivalRngState'].tolist()
+            pop.survival.rng.set_state(('MT19937', arrays['survivalRngKeys'], 
+                                        int(rngPos), int(rngHasGauss), 
+                                        rngGauss))
+        return pop
+
+
     def solve(self, n_generation):
         '''
         execute a number of generations. Stops if self.solved()
@@ -285,4 +662,10 @@ class Population(object):
             if self.verbose:
                 for chro in self.bestFront:
                     print  "1st rank:", chro.fitnesses
+                
+                if self.fitnessCache is not None:
+                    print "fitness cache: %(hits)s hits, %(misses)s misses, "\
+                          "%(evictions)s evictions, %(size)s cached"%(
+                          self.fitnessCache.stats())
+                    self.fitnessCache.resetStats()
         
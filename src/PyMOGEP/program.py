@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+compiling the evaluated region of a gene into a flat register program.
+
+register idx holds the value of the idx-th allele of the gene, and the
+children of an allele always have larger indices than the allele itself
+(in both level order and prefix order genes), so the instructions are
+executed in descending index order and the result is left in register 0.
+
+the program is compiled to a straight-line python function once, and it
+can be replayed against any data set without re-walking the alleles.
+
+the numbers and the RNC constants are numpy scalars broadcast by the
+functions, and the subtrees without variables (including the nullary
+functions) are folded to one constant when the program is built. A 
+folded subtree with numbers is of kind NUMBER, which is repeated to the 
+length of the data set at the root as the unfolded program did, else it 
+is of kind RNC and the program returns a scalar.
+'''
+import numpy as np
+from PyMOGEP.decorator import cache
+from PyMOGEP.dataset import columnArrays
+
+__all__ = ['FUNCTION', 'VARIABLE', 'NUMBER', 'RNC', 'Program', 'RootCall']
+
+# kinds of instruction
+FUNCTION, VARIABLE, NUMBER, RNC = range(4)
+
+
+class Program(object):
+    '''flat register program of the evaluated region of a gene'''
+
+    def __init__(self, alleles, children, constants=None):
+        '''
+        @param alleles: list, evaluated alleles of the gene
+        @param children: list of tuple, register indices of the arguments
+                         of each allele
+        @param constants: dict, register idx -> RNC constant of the allele '?'
+
+        @ivar instructions: list of (register, kind, value, argument registers)
+                            in execution order
+        @ivar children: list of tuple, argument registers of each register
+        @ivar heights: list, height of the subtree rooted at each register,
+                       terminals and nullary functions are of height 0
+        '''
+        assert len(alleles) == len(children)
+        constants = constants or {}
+        self.length = len(alleles)
+        self.instructions = []
+        self.children = list(children)
+        self.heights = [0] * self.length
+
+        for idx in reversed(xrange(self.length)):
+            allele = alleles[idx]
+            if callable(allele):
+                inst = (idx, FUNCTION, allele, children[idx])
+                if children[idx]:
+                    self.heights[idx] = 1 + max(self.heights[arg] 
+                                                for arg in children[idx])
+            elif isinstance(allele, str):
+                if allele != '?':
+                    inst = (idx, VARIABLE, allele, ())
+                else:
+                    inst = (idx, RNC, np.float64(constants[idx]), ())
+            elif isinstance(allele, (int, long, float)):
+                inst = (idx, NUMBER, np.float64(allele), ())
+            else:
+                raise ValueError('unknown allele %r at index %s'%(allele, idx))
+            self.instructions.append(inst)
+        self._fold()
+        self.variables = tuple(set(value for _, kind, value, _ in 
+                                   self.instructions if kind == VARIABLE))
+
+        # the source code is generated on the first run
+        self._func = None
+
+
+    def _fold(self):
+        '''
+        constant folding, the function of constant arguments is computed 
+        once and replaced by its result, the functions raising an error or 
+        returning an array are left to the run.
+        '''
+        folded = {}   # register -> (kind, value)
+        for reg, kind, value, args in self.instructions:
+            if kind in (NUMBER, RNC):
+                folded[reg] = (kind, value)
+            elif kind == FUNCTION and all(arg in folded for arg in args):
+                try:
+                    result = value(*[folded[arg][1] for arg in args])
+                except Exception:
+                    continue
+                if np.ndim(result) != 0:
+                    continue
+                hasNumber = any(folded[arg][0] == NUMBER for arg in args)
+                folded[reg] = (NUMBER if hasNumber else RNC, result)
+
+        # the arguments of the folded functions are not executed
+        needed = [False] * self.length
+        needed[0] = True
+        instructions = []
+        for reg, kind, value, args in reversed(self.instructions):
+            if not needed[reg]:
+                continue
+            if kind == FUNCTION and reg in folded:
+                kind, value = folded[reg]
+                args = self.children[reg] = ()
+                self.heights[reg] = 0
+            for arg in args:
+                needed[arg] = True
+            instructions.append((reg, kind, value, args))
+        self.instructions = instructions[::-1]
+
+        for reg, kind, value, args in self.instructions:
+            self.heights[reg] = (1 + max(self.heights[arg] for arg in args)
+                                 if args else 0)
+
+
+    def _generate(self):
+        '''
+        generates the source code of the program and compiles it.
+        functions and constants are bound to the namespace of the code,
+        thus the program body only consists of calls and assignments.
+        @return: function(df, columns), the compiled program, columns is
+                 the dict of the variables (PyMOGEP.dataset.columnArrays)
+        '''
+        namespace = {'repeat': np.repeat}
+        body = []
+        for reg, kind, value, args in self.instructions:
+            if kind == FUNCTION:
+                namespace['f%d'%reg] = value
+                body.append('r%d = f%d(%s)'%(
+                    reg, reg, ', '.join('r%d'%arg for arg in args)))
+            elif kind == VARIABLE:
+                body.append('r%d = columns[%r]'%(reg, value))
+            elif kind == NUMBER and reg == 0:
+                namespace['c%d'%reg] = value
+                body.append('r%d = repeat(c%d, len(df))'%(reg, reg))
+            else:
+                namespace['c%d'%reg] = value
+                body.append('r%d = c%d'%(reg, reg))
+        body.append('return r0')
+
+        source = 'def program(df, columns):\n%s\n'%(
+                        '\n'.join('    %s'%line for line in body))
+        exec(compile(source, '<gene program>', 'exec'), namespace)
+        return namespace['program']
+
+
+    @cache
+    def _signatures(self):
+        '''
+        canonical signature of the subtree rooted at each register,
+        (kind, value) for the terminals and (function, signatures of 
+        the arguments) for the functions.
+        '''
+        signatures = [None] * self.length
+        for reg, kind, value, args in self.instructions:
+            if kind == FUNCTION:
+                signatures[reg] = (value,) + tuple(signatures[arg] 
+                                                   for arg in args)
+            else:
+                signatures[reg] = (kind, value)
+        return signatures
+
+    signatures = property(lambda self: self._signatures(), 
+                          doc='canonical signature of each subtree')
+
+
+    def run(self, df, memory=None):
+        '''
+        @param df, pandas.DataFrame or PyMOGEP.dataset.Dataset, 
+                   user specified data set
+        @param memory: PyMOGEP.memory.SubtreeCache, results of the subtrees
+                       shared by all programs, or None
+        @return: numpy.array, result of the program
+        '''
+        if memory is not None:
+            return self._runMemory(df, memory)
+
+        if self._func is None:
+            self._func = self._generate()
+        return self._func(df, columnArrays(df, self.variables))
+
+
+    def runRoot(self, df, memory=None):
+        '''
+        runs the program but its root, thus the caller can apply the root
+        to blocks of rows without the full size result
+        (e.g. PyMOGEP.objective.accumulate).
+        @param df, memory: see run()
+        @return: RootCall if the root is a function with ufunc attribute
+                 (PyMOGEP.decorator.ufunc), else the result of the program
+        '''
+        reg, kind, value, args = self.instructions[-1]
+        uf = getattr(value, 'ufunc', None)
+        if kind != FUNCTION or not args or uf is None:
+            return self.run(df, memory)
+        values = self._execute(df, memory, args)
+        return RootCall(uf, [values[arg] for arg in args])
+
+
+    def _runMemory(self, df, memory):
+        '''@return: result of the program, the subtrees are shared by memory'''
+        result = self._execute(df, memory, (0, ))[0]
+        if isinstance(result, np.ndarray) and not result.flags.writeable:
+            # the whole program is cached, the cached arrays are read-only
+            result = result.copy()
+        return result
+
+
+    def _execute(self, df, memory, roots):
+        '''
+        the subtrees are looked up in the memory from the roots, the
+        arguments of a cached subtree are not needed, then the missed
+        subtrees are computed from the leaves and stored in the memory.
+        @param memory: PyMOGEP.memory.SubtreeCache or None
+        @param roots: registers to compute
+        @return: list, value of each computed register
+        '''
+        if memory is not None:
+            memory.bind(df)
+        signatures = self.signatures
+        columns = columnArrays(df, self.variables)
+        values = [None] * self.length
+        needed = [False] * self.length
+        for reg in roots:
+            needed[reg] = True
+        for reg, kind, value, args in reversed(self.instructions):
+            if not needed[reg]:
+                continue
+            if kind == FUNCTION and args:
+                if memory is not None:
+                    values[reg] = memory.get(signatures[reg])
+                if values[reg] is None:
+                    for arg in args:
+                        needed[arg] = True
+
+        for reg, kind, value, args in self.instructions:
+            if not needed[reg] or values[reg] is not None:
+                continue
+            if kind == FUNCTION:
+                values[reg] = value(*[values[arg] for arg in args])
+                if args and memory is not None:
+                    memory.put(signatures[reg], values[reg])
+            elif kind == VARIABLE:
+                values[reg] = columns[value]
+            elif kind == NUMBER and reg == 0:
+                values[reg] = np.repeat(value, len(df))
+            else:
+                values[reg] = value
+        return values
+
+
+    def __len__(self):
+        '''@return: number of instructions'''
+        return self.length
+
+
+class RootCall(object):
+    '''
+    root of a program whose arguments are computed, the result of the
+    program is computed block by block of rows.
+    '''
+
+    def __init__(self, ufunc, args):
+        '''
+        @param ufunc: numpy.ufunc of the root function
+        @param args: list, values of the arguments, arrays of the rows or
+                     scalars
+        '''
+        self.ufunc = ufunc
+        self.args = args
+
+
+    def block(self, start, stop, out):
+        '''
+        @param start, stop: rows [start, stop) of the result
+        @param out: float array of length stop - start
+        @return: out, result of the program on the rows
+        '''
+        return self.ufunc(*[arg[start: stop] if np.ndim(arg) else arg
+                            for arg in self.args], out=out)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+efficient non-dominated sort with binary search (ENS-BS):
+X. Zhang, Y. Tian, R. Cheng, and Y. Jin, "An Efficient Approach to
+Nondominated Sorting for Evolutionary Multiobjective Optimization,"
+Evolutionary Computation, IEEE Transactions on, vol. 19, pp. 201-213, 2015.
+
+incremental insertion into existing fronts (ENLU):
+K. Li, K. Deb, Q. Zhang, and S. Kwong, "Efficient non-domination level
+update approach for steady-state evolutionary multiobjective optimization,"
+Technical Report, Michigan State University, 2014.
+
+if a chromosome of front k dominates p, then a chromosome of each front
+before k also dominates p (transitivity), hence the front of p can be
+found by binary search over the fronts.
+'''
+
+__all__ = ['ENSNonDominatedSort', 'insertNonDominatedSort']
+
+
+def _dominating(fitnesses1, fitnesses2):
+    '''
+    the same comparison as Chromosome.dominating on the fitness tuples
+    @return: True if fitnesses1 dominating fitnesses2 (minimum is better)
+    '''
+    allSame = True
+    for val1, val2 in zip(fitnesses1, fitnesses2):
+        if val1 > val2:
+            return False
+        if val1 != val2:
+            allSame = False
+    return not allSame
+
+
+def _frontIndex(ParetoFronts, fitnesses):
+    '''
+    @return: index of the first front that no chromosome in it dominating
+             the fitnesses, len(ParetoFronts) if all fronts dominating it
+    '''
+    low, high = 0, len(ParetoFronts)
+    while low < high:
+        mid = (low + high) // 2
+        # the last added chromosomes are the most likely dominating ones
+        if any(_dominating(chro.fitnesses, fitnesses)
+               for chro in reversed(ParetoFronts[mid])):
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def ENSNonDominatedSort(population):
+    '''
+    the chromosomes are visited in lexicographic order of fitnesses, thus
+    a chromosome is never dominated by the later ones, and its front is
+    final when it is inserted.
+    @param population, list of PyMOGEP.chromosome
+    @return all Pareto fronts (list of non-dominated set)
+    '''
+    ParetoFronts = []
+    for chro in sorted(population, key=lambda chro: chro.fitnesses):
+        idx = _frontIndex(ParetoFronts, chro.fitnesses)
+        if idx == len(ParetoFronts):
+            ParetoFronts.append([])
+        ParetoFronts[idx].append(chro)
+        chro.ParetoRank = idx + 1
+    return ParetoFronts
+
+
+def insertNonDominatedSort(ParetoFronts, chromosomes):
+    '''
+    inserts the chromosomes into the Pareto fronts, only the chromosomes
+    dominated by an inserted one are moved to the worse fronts, the other
+    ranks are kept.
+    @param ParetoFronts: all Pareto fronts (list of non-dominated set),
+                         it is modified in place
+    @param chromosomes: list of PyMOGEP.chromosome
+    @return all Pareto fronts (list of non-dominated set)
+    '''
+    for chro in chromosomes:
+        idx = _frontIndex(ParetoFronts, chro.fitnesses)
+        moved = [chro, ]
+        while moved:
+            if idx == len(ParetoFronts):
+                ParetoFronts.append([])
+            front = ParetoFronts[idx]
+
+            # the chromosomes of this front dominated by the moved ones
+            # are moved to the next front
+            stay, nextMoved = [], []
+            for member in front:
+                if any(_dominating(movedChro.fitnesses, member.fitnesses)
+                       for movedChro in moved):
+                    nextMoved.append(member)
+                else:
+                    stay.append(member)
+
+            for movedChro in moved:
+                movedChro.ParetoRank = idx + 1
+            stay.extend(moved)
+            ParetoFronts[idx] = stay
+            moved = nextMoved
+            idx += 1
+    return ParetoFronts
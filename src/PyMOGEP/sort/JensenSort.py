@@ -12,6 +12,7 @@ vol. 7, pp. 503-515, 2003.
 '''
 
 import bisect
+import numpy as np
 
 def twoObjectivCmpFunc(chro1, chro2):
     '''
@@ -35,39 +36,32 @@ def twoObjectivesSweepAlgorithm(population):
     '''
     @param population, PyMOGEP.population
     time complexity O(NlogN), N: population size
+    
+    the chromosomes are visited in ascending order of (f1, f2), hence all
+    visited chromosomes have f1 not larger than the current one, and a 
+    front dominates the current chromosome if and only if the (f2, f1) of 
+    its last chromosome is less than the (f2, f1) of the current one. 
+    The keys of the fronts are ascending, and the front of the chromosome
+    is found by bisection.
     '''
+    F = np.array([chro.fitnesses for chro in population], dtype=np.float64)
+    assert F.shape[1] == 2
+    
+    #increasing (dominating), O(NlogN), the sort is stable
+    order = np.lexsort((F[:, 1], F[:, 0]))
+    population[:] = [population[idx] for idx in order]
     
-    #decreasing (dominating), O(NlogN)
-    population.sort(cmp=twoObjectivCmpFunc, reverse=True)
-    ParetoFronts =[[population[0]],]
-    
-    frontCounter = 0
-    for chro in population[1:]:
-        #check if current chromosome is dominated by 
-        #any chromosome in ParetoFronts[frontCounter]
-        isDominated = False
-        for frontChro in ParetoFronts[frontCounter]:
-            if frontChro.dominating(chro):
-                isDominated = True
-                break
-            
-        if isDominated:
-            #because the chromosome is isDominated by one chromosome
-            #in the Pareto front level i, the chromosome must at least 
-            #belong to Pareto front level (i+1)
+    ParetoFronts, frontKeys = [], []
+    for chro, (f1, f2) in zip(population, F[order].tolist()):
+        key = (f2, f1)
+        level = bisect.bisect_left(frontKeys, key)
+        if level == len(ParetoFronts):
             ParetoFronts.append([])
-            frontCounter += 1
-            ParetoFronts[frontCounter].append(chro)
-            
+            frontKeys.append(key)
         else:
-            #find lowest front b such that
-            # any chromosome in Paretofronts[b] not dominating the chromosome
-            b = 0
-            for level in xrange(frontCounter+1):
-                if not any(chro2.dominating(chro) for chro2 in ParetoFronts[level]):
-                    b = level
-                    break
-            ParetoFronts[b].append(chro)
+            frontKeys[level] = key
+        ParetoFronts[level].append(chro)
+        chro.ParetoRank = level + 1
     return ParetoFronts
 
 
@@ -76,114 +70,204 @@ def highObjectivesNonDominatedSort(population):
     
     assert population[0].n_objectives > 2
     
-    #initialize rank
-    for chro in population:
-        chro.ParetoRank = 1
-    
-    ND_helper_A(population)
+    F = np.array([chro.fitnesses for chro in population], dtype=np.float64)
+    ranks = nonDominatedRanks(F)
     
     #allocating each point to corresponding front    
-    n_front = max(chro.ParetoRank for chro in population)
-    ParetoFronts = [ [] for _ in xrange(n_front)]
-    [ParetoFronts[chro.ParetoRank-1].append(chro) for chro in population]
+    ParetoFronts = [ [] for _ in xrange(ranks.max())]
+    for chro, rank in zip(population, ranks.tolist()):
+        chro.ParetoRank = rank
+        ParetoFronts[rank-1].append(chro)
     
     return ParetoFronts
 
 
-def splitSet(population):
+# the pairs of L and H are compared directly if |L|*|H| is not larger
+BRUTE_FORCE_SIZE = 4096
+
+
+def nonDominatedRanks(F):
     '''
-    split population according to m-th objective value.
-    @return median index of m-th objective value.
+    generalized Jensen algorithm with ties, time complexity O(N log^(M-1) N)
+    
+    F.-A. Fortin, S. Grenier, and M. Parizeau, "Generalizing the improved 
+    run-time complexity algorithm for non-dominated sorting," GECCO 2013.
+    M. Buzdalov and A. Shalyto, "A Provably Asymptotically Fast Version of 
+    the Generalized Jensen Algorithm for Non-dominated Sorting," PPSN 2014.
+    
+    the points are sorted lexicographically once, and the identical points
+    are merged. The subsets in the recursion are arrays of indices in the 
+    lexicographic order, which are split by masks without sorting again, 
+    hence a point is never dominated by the later points of a subset.
+    
+    @param F: float array (N, M), fitness matrix (minimum is better)
+    @return: integer array (N,), Pareto rank of each point, 1 is the best
     '''
-    popSize = len(population)
-    n_objectives = population[0].n_objectives
+    F = np.asarray(F, dtype=np.float64)
+    N, M = F.shape
+    if N == 0:
+        return np.zeros(0, dtype=np.int64)
     
-    midPopIdx  = (popSize-1)/2 if popSize % 2 else popSize/2 - 1
-
-    #all object in set H will not dominating L
-    for objectiveIdx in reversed(xrange(n_objectives)):
-        population.sort(key = lambda chro: chro.fitnesses[objectiveIdx])
-        values = [chro.fitnesses[objectiveIdx] for chro in population]
-        
-        medianIdx = bisect.bisect_right(values, values[midPopIdx])
-        if medianIdx != popSize:
-            return medianIdx-1, objectiveIdx
-        else:
-            #we can't split the list after index midPopIdx, 
-            #hence, we try to split it beroe the midPopIdx
-            medianIdx = bisect.bisect_left(values, values[midPopIdx])
-            if medianIdx != 0:
-                return medianIdx-1, objectiveIdx
+    # the first objective is the primary key
+    order = np.lexsort(F.T[::-1])
+    sortedF = F[order]
+    distinct = np.ones(N, dtype=bool)
+    distinct[1:] = (sortedF[1:] != sortedF[:-1]).any(axis=1)
+    points = sortedF[distinct]
+    
+    ranks = np.zeros(len(points), dtype=np.int64)
+    if M == 1:
+        ranks[:] = np.arange(len(points))
+    else:
+        ND_helper_A(points, ranks, np.arange(len(points)), M-1)
     
-    #all fitness values in the population are the same
-    return -1, -1
+    result = np.empty(N, dtype=np.int64)
+    result[order] = ranks[np.cumsum(distinct) - 1] + 1
+    return result
+
+
+def _median(values):
+    '''@return: the median element of values, O(n)'''
+    return np.partition(values, len(values)//2)[len(values)//2]
 
 
-def ND_helper_A(population):
+def ND_helper_A(F, ranks, S, objectiveIdx):
     '''
-    split population to two sets, L and H, according to objectives[objectiveIdx]
-    1. find the median of objectives[objectiveIdx]
-    2. the objectives[objectiveIdx] of all chromosomes in set L are less than
-       the median 
-    3. the objectives[objectiveIdx] of all chromosomes in set H are large than
-       the median
-       
-    the chromosome in set H are impossible to dominate the chromosome in set L
-    (because the m-th objective value of chromosome in set H are larger than 
-    the m-th objectivce value of chromsome in set L)
+    assigns the ranks of the points in S, according to the objectives 
+    0 ... objectiveIdx, all points in S have the same values of the 
+    objectives after objectiveIdx.
+    
+    S is split to L, M and H by the median of objectives[objectiveIdx],
+    the points in set H are impossible to dominate the points in set L and 
+    M, and the points in set M are impossible to dominate the points in L.
+    
+    @param F: float array, the distinct points in lexicographic order
+    @param ranks: integer array, ranks (starts from 0) of the points
+    @param S: integer array, ascending indices of the points
+    @param objectiveIdx: integer, index of the last compared objective
     '''
-    popSize = len(population)
+    if len(S) < 2:
+        return
     
-    if popSize == 2:
+    if len(S) == 2:
         # stop condition
-        if population[0].dominating(population[1]):
-            population[1].ParetoRank = max(population[0].ParetoRank+1, 
-                                           population[1].ParetoRank)
-        elif  population[1].dominating(population[0]):
-            population[0].ParetoRank = max(population[0].ParetoRank, 
-                                           population[1].ParetoRank+1)
-    
-    elif popSize > 2:
-        medianIdx, objectiveIdx = splitSet(population)
-        if medianIdx == -1:
-            #all fitess values in the population are the same
-            return
-        
-        L, H = population[:medianIdx+1], population[medianIdx+1:]
-        
-        #check dominating relations in set L, and computing Pareto rank
-        ND_helper_A(L)
-        #merge
-        ND_helper_B(L, H, objectiveIdx-1)
-        #check dominating relations in set H
-        ND_helper_A(H)
+        idx, jdx = S
+        if (F[idx, :objectiveIdx+1] <= F[jdx, :objectiveIdx+1]).all():
+            ranks[jdx] = max(ranks[jdx], ranks[idx] + 1)
+        return
+    
+    if objectiveIdx == 1:
+        sweepA(F, ranks, S)
+        return
+    
+    values = F[S, objectiveIdx]
+    median = _median(values)
+    low, high = values < median, values > median
+    if not low.any() and not high.any():
+        #all values of the objective in S are the same
+        ND_helper_A(F, ranks, S, objectiveIdx-1)
+        return
+    
+    L, M, H = S[low], S[~(low | high)], S[high]
+    ND_helper_A(F, ranks, L, objectiveIdx)
+    ND_helper_B(F, ranks, L, M, objectiveIdx-1)
+    ND_helper_A(F, ranks, M, objectiveIdx-1)
+    ND_helper_B(F, ranks, S[~high], H, objectiveIdx-1)
+    ND_helper_A(F, ranks, H, objectiveIdx)
         
 
-def ND_helper_B(L, H, objectiveIdx):
+def ND_helper_B(F, ranks, L, H, objectiveIdx):
     '''
-    the procedure assigns Pareto rank to the solutions in H 
-    according to the solutions in L.
-    assumpting all Pareto rank of the chromosome in set L are assigned.
-    
+    the procedure assigns Pareto rank to the points in H 
+    according to the points in L, by the objectives 0 ... objectiveIdx.
+    assumpting all Pareto rank of the points in set L are assigned, and 
+    the points in L are not worse than the points in H on the objectives
+    after objectiveIdx.
     '''
-    if len(L) == 1:
+    if not len(L) or not len(H):
+        return
+    
+    if len(L) * len(H) <= BRUTE_FORCE_SIZE:
         #stop condition
-        for chro in H:
-            if L[0].dominating(chro):
-                chro.ParetoRank = max(chro.ParetoRank, L[0].ParetoRank+1)
-                
-    elif len(H) == 1:
-        #stop condition 
-        for chro in L:
-            if chro.dominating(H[0]):
-                H[0].ParetoRank = max(chro.ParetoRank+1, H[0].ParetoRank)
-                
-    elif 0 <= objectiveIdx < L[0].n_objectives:
-        #for better performance, we don't split the set deeply. 
-        L.sort(key=lambda chro: chro.ParetoRank, reverse=True)  #descending
-        for chroH in H:
-            for chroL in L:
-                if chroL.dominating(chroH):
-                    chroH.ParetoRank = max(chroL.ParetoRank+1, chroH.ParetoRank)
-                    break
-  
\ No newline at end of file
+        dominating = np.ones((len(L), len(H)), dtype=bool)
+        for idx in xrange(objectiveIdx+1):
+            dominating &= F[L, idx, None] <= F[None, H, idx]
+        ranks[H] = np.maximum(ranks[H], np.where(
+                        dominating, ranks[L, None] + 1, 0).max(axis=0))
+        return
+    
+    if objectiveIdx == 1:
+        sweepB(F, ranks, L, H)
+        return
+    
+    LValues, HValues = F[L, objectiveIdx], F[H, objectiveIdx]
+    if LValues.max() <= HValues.min():
+        ND_helper_B(F, ranks, L, H, objectiveIdx-1)
+        return
+    if LValues.min() > HValues.max():
+        return
+    
+    median = _median(np.concatenate((LValues, HValues)))
+    ND_helper_B(F, ranks, L[LValues < median], H[HValues < median], 
+                objectiveIdx)
+    ND_helper_B(F, ranks, L[LValues <= median], H[HValues >= median], 
+                objectiveIdx-1)
+    ND_helper_B(F, ranks, L[LValues > median], H[HValues > median], 
+                objectiveIdx)
+
+
+def _stairInsert(keys, levels, key, level):
+    '''
+    inserts (key, level) to the staircase, the keys (the second objective)
+    and the levels (rank) are both ascending, and the pairs with larger 
+    key and not larger level are removed.
+    '''
+    pos = bisect.bisect_left(keys, key)
+    if pos and levels[pos-1] >= level:
+        return
+    if pos < len(keys) and keys[pos] == key and levels[pos] >= level:
+        return
+    end = pos
+    while end < len(keys) and levels[end] <= level:
+        end += 1
+    keys[pos:end] = [key, ]
+    levels[pos:end] = [level, ]
+
+
+def sweepA(F, ranks, S):
+    '''
+    two objectives sweep of the points in S, the points are visited
+    in ascending order of the first objective, and the largest rank of the 
+    visited points with the second objective not larger than the current 
+    one is found in the staircase by bisection.
+    '''
+    keys, levels = [], []
+    SRanks = ranks[S].tolist()
+    for idx, value in enumerate(F[S, 1].tolist()):
+        pos = bisect.bisect_right(keys, value)
+        if pos:
+            SRanks[idx] = max(SRanks[idx], levels[pos-1] + 1)
+        _stairInsert(keys, levels, value, SRanks[idx])
+    ranks[S] = SRanks
+
+
+def sweepB(F, ranks, L, H):
+    '''
+    two objectives sweep assigning the ranks of the points in H according 
+    to the points in L, the points of L with first objective not larger 
+    than the current point of H are inserted into the staircase.
+    '''
+    keys, levels = [], []
+    LFirst, LSecond = F[L, 0].tolist(), F[L, 1].tolist()
+    LRanks, HRanks = ranks[L].tolist(), ranks[H].tolist()
+    
+    idx = 0
+    for jdx, (first, second) in enumerate(zip(F[H, 0].tolist(), 
+                                              F[H, 1].tolist())):
+        while idx < len(L) and LFirst[idx] <= first:
+            _stairInsert(keys, levels, LSecond[idx], LRanks[idx])
+            idx += 1
+        pos = bisect.bisect_right(keys, second)
+        if pos:
+            HRanks[jdx] = max(HRanks[jdx], levels[pos-1] + 1)
+    ranks[H] = HRanks
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+non-dominated sorting on the (N, M) fitness matrix of the population,
+N: population size, M: number of objectives (minimum is better).
+
+the domination relations are computed by numpy comparisons of blocks of
+rows, the peeling of the fronts is the same as DebSort.DebNonDominatedSort.
+'''
+import numpy as np
+
+__all__ = ['fitnessMatrix', 'dominationMatrix', 'nonDominatedRanks',
+           'ranksToFronts', 'crowdingDistances']
+
+
+def fitnessMatrix(population):
+    '''@return: float array (N, M), fitnesses of the chromosomes'''
+    return np.array([chro.fitnesses for chro in population], dtype=np.float64)
+
+
+def dominationMatrix(F1, F2):
+    '''
+    @param F1: float array (N1, M)
+    @param F2: float array (N2, M)
+    @return: boolean array (N1, N2), F1[i] dominating F2[j]
+    '''
+    notWorse = np.ones((len(F1), len(F2)), dtype=bool)
+    better = np.zeros((len(F1), len(F2)), dtype=bool)
+    for objIdx in xrange(F1.shape[1]):
+        col1, col2 = F1[:, objIdx, None], F2[None, :, objIdx]
+        notWorse &= col1 <= col2
+        better |= col1 < col2
+    return notWorse & better
+
+
+def _dominatedCount(F1, F2, chunkSize):
+    '''@return: integer array (N2,), number of F1 points dominating F2[j]'''
+    count = np.zeros(len(F2), dtype=np.int64)
+    for start in xrange(0, len(F1), chunkSize):
+        count += dominationMatrix(F1[start: start + chunkSize], F2).sum(axis=0)
+    return count
+
+
+def nonDominatedRanks(F, chunkSize=None):
+    '''
+    @param F: float array (N, M), fitness matrix
+    @param chunkSize: positive integer or None, if None, the (N, N)
+                      domination matrix is kept, else the dominations are
+                      computed again by blocks of chunkSize rows when
+                      peeling the fronts, which bounds the memory
+                      to O(chunkSize * N).
+    @return: integer array (N,), Pareto rank of each point, 1 is the best
+    '''
+    F = np.asarray(F, dtype=np.float64)
+    N = len(F)
+    ranks = np.zeros(N, dtype=np.int64)
+    if N == 0:
+        return ranks
+
+    if chunkSize is None:
+        dominating = dominationMatrix(F, F)
+        count = dominating.sum(axis=0)
+    else:
+        count = _dominatedCount(F, F, chunkSize)
+
+    front = np.flatnonzero(count == 0)
+    rank = 1
+    while len(front):
+        ranks[front] = rank
+        remaining = np.flatnonzero(ranks == 0)
+        if not len(remaining):
+            break
+
+        if chunkSize is None:
+            count[remaining] -= dominating[np.ix_(front, remaining)].sum(axis=0)
+        else:
+            count[remaining] -= _dominatedCount(F[front], F[remaining],
+                                                chunkSize)
+        front = remaining[count[remaining] == 0]
+        rank += 1
+    return ranks
+
+
+def ranksToFronts(population, ranks):
+    '''
+    sets chromosome.ParetoRank and groups the chromosomes by rank
+    @param population: list of PyMOGEP.chromosome
+    @param ranks: integer array, Pareto rank (starts from 1) of each chromosome
+    @return all Pareto fronts (list of non-dominated set)
+    '''
+    ParetoFronts = [[] for _ in xrange(int(ranks.max()))]
+    for chro, rank in zip(population, ranks.tolist()):
+        chro.ParetoRank = rank
+        ParetoFronts[rank - 1].append(chro)
+    return ParetoFronts
+
+
+def crowdingDistances(F, ranks=None):
+    '''
+    crowding distances of NSGA-II, the same values as
+    Population._crowdingDistanceAssignment, which sorts the front by each
+    objective in turn with a stable sort, thus the points of the idx-th
+    objective are ordered by the objectives idx, idx-1, ..., 0.
+    the boundary points of each objective get an infinite distance, and
+    the distance is not normalized if the objective is constant.
+
+    @param F: float array (N, M), fitness matrix
+    @param ranks: integer array (N,) or None, if given, the distances of
+                  all fronts are computed at once, else all points
+                  belong to one front
+    @return: float array (N,), crowding distance of each point
+    '''
+    F = np.asarray(F, dtype=np.float64)
+    N, M = F.shape
+    distances = np.zeros(N)
+    if N == 0:
+        return distances
+
+    for objIdx in xrange(M):
+        keys = [F[:, idx] for idx in xrange(objIdx + 1)]
+        if ranks is not None:
+            keys.append(ranks)
+        order = np.lexsort(keys)
+        values = F[order, objIdx]
+
+        # the first and last points of each front
+        first = np.ones(N, dtype=bool)
+        last = np.ones(N, dtype=bool)
+        if ranks is not None:
+            sortedRanks = np.asarray(ranks)[order]
+            first[1:] = last[:-1] = sortedRanks[1:] != sortedRanks[:-1]
+        else:
+            first[1:] = last[:-1] = False
+
+        frontIdx = np.cumsum(first) - 1
+        scales = (values[last] - values[first])[frontIdx]
+        scales[scales == 0] = 1.
+
+        contributions = np.empty(N)
+        contributions[1:-1] = values[2:] - values[:-2]
+        interior = ~(first | last)
+        contributions[interior] /= scales[interior]
+        contributions[~interior] = np.inf
+        distances[order] += contributions
+    return distances
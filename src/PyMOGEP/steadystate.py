@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+'''
+@author: Hung-Hsin Chen
+@mail: chenhh@par.cse.nsysu.edu.tw
+@license: GPLv2
+
+asynchronous steady-state evolution: there is no generation barrier, a
+few offspring are bred as soon as an evaluation slot is free and
+submitted to the evaluator without blocking, and each completed batch
+is inserted into the Pareto fronts of the population by the incremental
+non-dominated sorting (PyMOGEP.sort.ENSSort), then the chromosomes of the
+worst front with the least crowding distances are removed.
+
+with PyMOGEP.parallel.ProcessPoolEvaluator, n_inflight batches are kept
+in the worker processes, thus the workers are never idle waiting for
+the slowest chromosome of a generation. The other evaluators evaluate
+the offspring synchronously.
+
+A. J. Nebro and J. J. Durillo, "On the Effect of Applying a Steady-State
+Selection Scheme in the Multi-Objective Genetic Algorithm NSGA-II,"
+Nature-Inspired Algorithms for Optimisation, pp. 435-456, 2009.
+'''
+from time import time
+import Queue
+from PyMOGEP.population import Population
+from PyMOGEP.sort import ENSSort
+
+__all__ = ['SteadyStatePopulation', ]
+
+
+class SteadyStatePopulation(Population):
+    '''population evolved by the asynchronous steady-state loop'''
+
+    _checkpointAttributes = ('_generation', 'evaluations')
+
+    def __init__(self, chro, popSize, headLength, n_genes=1, batchSize=2,
+                 n_inflight=None, **kwargs):
+        '''
+        @param chro, popSize, headLength, n_genes: see Population
+        @param batchSize: positive integer, number of the offspring bred
+                          and evaluated together
+        @param n_inflight: positive integer, maximum number of the batches
+                           being evaluated, default is twice the processes
+                           of the evaluator
+        @param kwargs: the other parameters of Population, the fitness
+                       and subtree caches are only used by the synchronous
+                       evaluators
+        '''
+        Population.__init__(self, chro, popSize, headLength, n_genes, **kwargs)
+        self._configureSteadyState(batchSize, n_inflight)
+        self.evaluations = 0    # number of the evaluated offspring
+
+
+    def _configureSteadyState(self, batchSize, n_inflight):
+        '''sets the parameters of the loop, shared by __init__ and load()'''
+        assert batchSize > 0
+        self.batchSize = batchSize
+        if n_inflight is None:
+            n_inflight = 2 * getattr(self.evaluator, 'n_processes', 1)
+        assert n_inflight > 0
+        self.n_inflight = n_inflight
+        self.throughput = 0.    # evaluations per second of the last solve
+
+
+    @classmethod
+    def load(cls, path, chro, batchSize=2, n_inflight=None, **kwargs):
+        '''
+        resumes the population checkpointed by save(), see Population.load
+        @param batchSize, n_inflight: see __init__
+        @return: the population
+        '''
+        pop = super(SteadyStatePopulation, cls).load(path, chro, **kwargs)
+        pop._configureSteadyState(batchSize, n_inflight)
+        return pop
+
+
+    def breed(self, n_offspring=None):
+        '''
+        @param n_offspring: positive integer, default is self.batchSize
+        @return: list of the offspring of the tournament selected parents
+        '''
+        if n_offspring is None:
+            n_offspring = self.batchSize
+        parents = self.selector(self.population, n_offspring, rng=self.rng)
+        return self.evolution(parents)
+
+
+    def insert(self, offspring):
+        '''
+        inserts the evaluated offspring into the Pareto fronts, and removes
+        the same number of chromosomes of the worst front, the most crowded
+        ones first.
+        @param offspring: list of evaluated PyMOGEP.chromosome
+        '''
+        ENSSort.insertNonDominatedSort(self.ParetoFronts, offspring)
+        for _ in offspring:
+            worstFront = self.ParetoFronts[-1]
+            self._crowdingDistanceAssignment(worstFront)
+            worst = min(worstFront, key=lambda chro: chro.crowdingDistance)
+            worstFront[:] = [chro for chro in worstFront if chro is not worst]
+            if not worstFront:
+                self.ParetoFronts.pop()
+
+        self.population = [chro for front in self.ParetoFronts
+                           for chro in front]
+        self._allCrowdingDistanceAssignment(self.ParetoFronts)
+        self.evaluations += len(offspring)
+        self._generation = self.evaluations // self.popSize
+
+
+    def solve(self, n_evaluations):
+        '''
+        evaluates n_evaluations offspring. Stops if self.solved()
+        @param n_evaluations: positive integer, number of evaluations
+        @return: float, throughput, evaluations per second
+        '''
+        submit = getattr(self.evaluator, 'submit', None)
+        completed = Queue.Queue()
+        callback = lambda chromosomes, error: completed.put((chromosomes, error))
+
+        t0 = time()
+        start = self.evaluations
+        n_submitted, n_running, solved = 0, 0, False
+        while n_running or (n_submitted < n_evaluations and not solved):
+            # keeps the evaluator busy
+            while (n_running < self.n_inflight and
+                   n_submitted < n_evaluations and not solved):
+                offspring = self.breed(min(self.batchSize,
+                                           n_evaluations - n_submitted))
+                n_submitted += len(offspring)
+                n_running += 1
+                if submit is not None:
+                    submit(offspring, type(self).train_df, callback)
+                else:
+                    self._evaluate(offspring)
+                    callback(offspring, None)
+
+            offspring, error = completed.get()
+            n_running -= 1
+            if error is not None:
+                raise RuntimeError('evaluation failed:\n%s'%error)
+
+            generation = self._generation
+            self.insert(offspring)
+            solved = (len(self.bestFront) > 0 and
+                      all(chro.solved for chro in self.bestFront))
+
+            if self._generation > generation:
+                elapsed = time() - t0
+                print "Generation[%s], %.1f evaluations/sec, "\
+                      "Best Pareto front size: %s"%(self._generation,
+                      (self.evaluations - start) / elapsed if elapsed else 0.,
+                      len(self.bestFront))
+                if self.verbose:
+                    for chro in self.bestFront:
+                        print  "1st rank:", chro.fitnesses
+
+        elapsed = time() - t0
+        self.throughput = ((self.evaluations - start) / elapsed
+                           if elapsed else 0.)
+        return self.throughput
+
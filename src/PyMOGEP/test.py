@@ -56,7 +56,85 @@ def testRandom():
     t0 = time()
     b = [np.random.rand() for _ in xrange(n)]
     print "%.3f secs"%(time()-t0)
+
+
+def testNonDominatedSort(n_objectives=(3, 5, 10), 
+                         popSizes=(1000, 2000, 5000, 20000), maxDebSize=2000):
+    '''
+    comparing the generalized Jensen sort with the Deb sort on random
+    fitnesses, the Deb sort (O(MN^2)) is skipped if N > maxDebSize.
+    '''
+    from PyMOGEP.chromosome import Chromosome
+    from PyMOGEP.sort import (JensenSort, DebSort)
+    
+    class Point(object):
+        def __init__(self, fitnesses):
+            self.fitnesses = fitnesses
+            self.n_objectives = len(fitnesses)
+        dominating = Chromosome.dominating.im_func
     
+    for M in n_objectives:
+        for N in popSizes:
+            population = [Point(tuple(f)) for f in np.random.rand(N, M)]
+            t0 = time()
+            JensenSort.highObjectivesNonDominatedSort(population)
+            jensenTime = time() - t0
+            ranks = [chro.ParetoRank for chro in population]
+            
+            if N > maxDebSize:
+                print "M=%s, N=%s, Jensen: %.3f secs, Deb: skipped"%(
+                        M, N, jensenTime)
+                continue
+            t0 = time()
+            DebSort.DebNonDominatedSort(population)
+            debTime = time() - t0
+            assert ranks == [chro.ParetoRank for chro in population]
+            print "M=%s, N=%s, Jensen: %.3f secs, Deb: %.3f secs"%(
+                    M, N, jensenTime, debTime)
+
+
+def testNumexprEvaluator(n_rows=(1000, 100000, 1000000), popSize=200):
+    '''
+    comparing the numexpr evaluator with the default (numpy) evaluator on
+    random chromosomes, the fitnesses are the means of the genes.
+    '''
+    import pandas as pd
+    from PyMOGEP.chromosome import Chromosome
+    from PyMOGEP.dataset import Dataset
+    from PyMOGEP.decorator import cacheName
+    from PyMOGEP.evaluator import Evaluator
+    from PyMOGEP.expression import NumexprEvaluator
+    from PyMOGEP.function.arithmetic import (op_multiply, op_modulus)
+    from PyMOGEP.function.power import (op_ln, op_root, op_square)
+
+    class Regression(Chromosome):
+        functions = (op_add, op_substract, op_multiply, op_modulus, op_ln,
+                     op_root, op_square, op_pi)
+        terminals = 'x', 'y'
+        def _fitnesses(self):
+            return tuple(float(np.mean(gene.eval(self.df)))
+                         for gene in self.genes)
+
+    np.random.seed(0)
+    chromosomes = [Regression.randomChromosome(10, 2,
+                                               RNCGenerator=np.random.randn)
+                   for _ in xrange(popSize)]
+    for n in n_rows:
+        Regression.df = Dataset.fromDataFrame(pd.DataFrame(
+                            {'x': np.random.rand(n), 'y': np.random.rand(n)}))
+        results = []
+        for evaluator in (Evaluator(), NumexprEvaluator()):
+            for chro in chromosomes:
+                if hasattr(chro, cacheName('_fitnesses')):
+                    delattr(chro, cacheName('_fitnesses'))
+            t0 = time()
+            evaluator.evaluate(chromosomes, Regression.df)
+            print "rows=%s, %s: %.3f secs"%(n, type(evaluator).__name__,
+                                             time() - t0)
+            results.append(np.array([chro.fitnesses for chro in chromosomes]))
+        assert np.allclose(results[0], results[1], equal_nan=True)
+
+
 if __name__ == '__main__':
 #     alleles = ['x', op_add,  op_pi,  op_add, 'y', 'y','y','y','y','y','y','y']
 #     requiredLen(alleles)